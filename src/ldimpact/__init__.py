@@ -0,0 +1,23 @@
+"""ldimpact -- Python post-processing of the three-rings impact simulations.
+
+This package is a NumPy-native port of the Matlab post-processing code
+stored in src/pprocess. It reads the .ascii files archived by Metafor in
+res/workspace/<s_name> and computes the same quantities, headless.
+
+Usage, from the src/ directory:
+    python -m ldimpact <s_name>
+or, from Python:
+    from ldimpact import main
+    out = main({"s_name": "template"})
+"""
+
+from .compute import (
+    compute_displacements,
+    compute_external_forces,
+    compute_kinetic,
+    compute_mean_motion,
+    compute_perimeters,
+)
+from .extract import extract_nodal_values
+from .main import main
+from .util import load_defaults, set_running_arguments
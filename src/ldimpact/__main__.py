@@ -0,0 +1,23 @@
+"""__main__ -- Run the post-processing from the command line.
+
+Usage:
+    python -m ldimpact [s_name] [--t-focus T] [--outs OUTS]
+"""
+
+import argparse
+
+from .main import main
+from .util import set_running_arguments
+
+parser = argparse.ArgumentParser(prog="ldimpact", description="Post-process a Metafor simulation.")
+parser.add_argument("s_name", nargs="?", help="simulation name, as in res/workspace/<s_name>")
+parser.add_argument("--t-focus", type=float, help="particular time of interest [s]")
+parser.add_argument("--outs", help="output options, e.g. 's'")
+args = parser.parse_args()
+
+run_arg = set_running_arguments()
+for key, value in (("s_name", args.s_name), ("t_focus", args.t_focus), ("outs", args.outs)):
+    if value is not None:
+        run_arg[key] = value
+
+main(run_arg)
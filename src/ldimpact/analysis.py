@@ -0,0 +1,299 @@
+"""analysis -- Batch analysis of a set of simulation results.
+
+Rather than copying the results of individual runs into the analysis
+scripts, e.g. the max_range table of src/analysis/lockin.m, this module
+reduces every run of a directory into scalar metrics, gathered with the
+run parameters in one table, one row per run.
+
+A run is any subdirectory holding a workspace, such as the case
+directories of a sweep or the entries of a ResultCache, or a packed
+workspace archive. Its parameters are read from its params.json, else from
+its layout.json. The runs are loaded and reduced concurrently, in a thread
+pool.
+
+The metrics are functions of a Run, registered in METRICS by the @metric
+decorator, that return a dict of scalar columns, empty if the fields they
+need were not archived. The metrics of each run are cached in
+<runs_dir>/.analysis/<run>.json, along with the stamp of its time sample
+and the digest of the code of each metric, see metric_digest(), so that
+adding runs or metrics, or changing a metric, only computes the new ones.
+
+Usage:
+    from ldimpact.analysis import analyze
+    table = analyze("res/workspace/lockin_sweep")
+"""
+
+import functools
+import hashlib
+import json
+import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .archive import ARCHIVE_EXT
+from .cache import replace_file
+from .energy import compute_energies
+from .extract import available_groups, open_layout, open_workspace, split_workspace
+from .main import post_process
+from .sweep import PARAMS, reduce_workspace, write_table
+
+ANALYSIS_DIR = ".analysis"
+TABLE = "analysis.csv"
+
+# Layout entries that are not run parameters
+_LAYOUT_ONLY = ("n_ring", "n_curve", "fields", "rings", "contacts")
+
+# Registered metrics, mapping their names to their functions
+METRICS = {}
+
+
+def metric(name):
+    """metric -- Register a function of a Run as a metric of the batch analysis."""
+    def register(function):
+        METRICS[name] = function
+        return function
+
+    return register
+
+
+class Run():
+    """Run -- Results of one simulation, loaded on first use.
+
+    Attributes:
+        sim_dir (str) -- Path of the simulation results.
+        name    (str) -- Name of the run, that of its directory.
+    """
+
+    def __init__(self, sim_dir):
+        self.sim_dir = sim_dir
+        self.name = os.path.basename(os.path.normpath(sim_dir))
+
+    @functools.cached_property
+    def ws(self):
+        """ws -- Archived nodal values of the whole problem."""
+        return open_workspace(self.sim_dir)
+
+    @functools.cached_property
+    def layout(self):
+        """layout -- Ring layout of the simulation, or None."""
+        return open_layout(self.sim_dir)
+
+    @functools.cached_property
+    def out(self):
+        """out -- Post-processed quantities, see main.post_process()."""
+        return post_process(*split_workspace(self.ws))
+
+    @functools.cached_property
+    def energies(self):
+        """energies -- Energies of the rings, see energy.compute_energies(), or None."""
+        if self.layout is None or not {"nspeed", "nfext", "nfint"} <= available_groups(self.ws):
+            return None
+
+        return compute_energies(self.ws, self.layout)
+
+    @property
+    def params(self):
+        """params -- Parameters of the run, as given to getMetafor(p)."""
+        try:
+            with open(os.path.join(self.sim_dir, PARAMS)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            pass
+
+        if self.layout is None:
+            return {}
+
+        return {key: value for key, value in self.layout.items() if key not in _LAYOUT_ONLY}
+
+    @property
+    def stamp(self):
+        """stamp -- Modification time and size of the results, to validate the cache."""
+        path = os.path.join(self.sim_dir, "tSample.ascii")
+        if not os.path.isfile(path):
+            path = os.path.normpath(self.sim_dir) + ARCHIVE_EXT
+        stat = os.stat(path)
+
+        return [stat.st_mtime_ns, stat.st_size]
+
+
+@metric("scalar_results")
+def scalar_results(run):
+    """scalar_results -- Scalar results of the sweeps, see sweep.reduce_workspace()."""
+    return reduce_workspace(run.ws)
+
+
+@metric("rebound_time")
+def rebound_time(run):
+    """rebound_time -- First time at which the CG of a moving ring goes backwards.
+
+    Only the rings moving at the first frame are considered. The time is NaN
+    if the ring never goes backwards.
+    """
+    if run.out["mspeed"] is None:
+        return {}
+
+    t_sample = run.out["t_sample"]
+    columns = {}
+    for i_ring, mspeed in enumerate(run.out["mspeed"]):
+        if mspeed["abs"][0] == 0:
+            continue
+        forward = mspeed["tx"]*mspeed["tx"][0] + mspeed["ty"]*mspeed["ty"][0]
+        backward = np.flatnonzero(forward < 0)
+        columns[f"rebound_time_ring{i_ring+1}"] = float(t_sample[backward[0]]) if backward.size else np.nan
+
+    return columns
+
+
+@metric("energy_loss")
+def energy_loss(run):
+    """energy_loss -- Ratio of the kinetic energy lost over the run, and energy balance error.
+
+    The balance error is approximate with more than one element through the
+    thickness of the rings, see energy.py.
+    """
+    if run.energies is None:
+        return {}
+
+    kinetic = run.energies["kinetic"].sum(axis=0)
+    balance = run.energies["balance"].sum(axis=0)
+
+    return {
+        "energy_loss_ratio": float(1 - kinetic[-1] / kinetic[0]) if kinetic[0] else np.nan,
+        "energy_balance_error": float(np.max(np.abs(balance)) / kinetic[0]) if kinetic[0] else np.nan,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def metric_digest(function):
+    """metric_digest -- Digest of the code of a metric function.
+
+    The code of the functions of this package that the metric calls by
+    their global name is included, e.g. sweep.reduce_workspace() and the
+    compute functions it calls, but not that of the methods of Run.
+
+    Argument:
+        function (callable) -- Metric function.
+    Return:
+        digest (str) -- Hexadecimal SHA-256 digest of the bytecode and the
+                        constants of the functions.
+    """
+    digest = hashlib.sha256()
+    pending, seen = [function], set()
+    while pending:
+        func = pending.pop()
+        if func in seen:
+            continue
+        seen.add(func)
+
+        codes = [func.__code__]
+        while codes:
+            code = codes.pop()
+            digest.update(code.co_code)
+            for const in code.co_consts:
+                if isinstance(const, types.CodeType):
+                    codes.append(const)
+                else:
+                    digest.update(repr(const).encode())
+            for name in code.co_names:
+                called = func.__globals__.get(name)
+                if isinstance(called, types.FunctionType) and called.__module__.startswith(__package__):
+                    pending.append(called)
+
+    return digest.hexdigest()
+
+
+def find_runs(runs_dir):
+    """find_runs -- Simulation results held by a directory.
+
+    Argument:
+        runs_dir (str) -- Directory of the runs.
+    Return:
+        sim_dirs (list) -- Paths of the runs, sorted by name. The runs
+                           packed into an archive are given by the path of
+                           their former directory.
+    """
+    sim_dirs = set()
+    for entry in os.scandir(runs_dir):
+        if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "tSample.ascii")):
+            sim_dirs.add(entry.path)
+        elif entry.is_file() and entry.name.endswith(ARCHIVE_EXT):
+            sim_dirs.add(entry.path[:-len(ARCHIVE_EXT)])
+
+    return sorted(sim_dirs)
+
+
+def evaluate(run, metrics, cache_dir=None):
+    """evaluate -- Evaluate the metrics of one run, through its cache.
+
+    A cached metric is only reused if the results did not change since,
+    nor the code of the metric, see metric_digest().
+
+    Arguments:
+        run       (Run)  -- Run to evaluate.
+        metrics   (dict) -- Metric functions, by name.
+        cache_dir (str)  -- Directory of the cached metrics, or None.
+    Return:
+        columns (dict) -- Scalar columns of all the metrics.
+    """
+    stamp = run.stamp
+    cached, digests = {}, {}
+    if cache_dir is not None:
+        try:
+            with open(os.path.join(cache_dir, run.name + ".json")) as file:
+                entry = json.load(file)
+            if entry["stamp"] == stamp:
+                cached, digests = entry["metrics"], entry["digests"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    missing = [
+        name for name in metrics
+        if name not in cached or digests.get(name) != metric_digest(metrics[name])
+    ]
+    for name in missing:
+        cached[name] = metrics[name](run)
+        digests[name] = metric_digest(metrics[name])
+
+    if cache_dir is not None and missing:
+        path = os.path.join(cache_dir, run.name + ".json")
+        with replace_file(path) as file:
+            json.dump({"stamp": stamp, "metrics": cached, "digests": digests}, file)
+
+    return {column: value for name in metrics for column, value in cached[name].items()}
+
+
+def analyze(runs_dir, metrics=None, max_workers=None, cache=True):
+    """analyze -- Evaluate the metrics of all the runs of a directory.
+
+    Arguments:
+        runs_dir    (str)  -- Directory of the runs, see find_runs().
+        metrics     (list) -- Names of the metrics to evaluate, defaults to
+                              all the registered METRICS.
+        max_workers (int)  -- Number of runs evaluated concurrently, defaults
+                              to the ThreadPoolExecutor default.
+        cache       (bool) -- Go through the cached metrics of the runs.
+    Return:
+        table (list) -- One row dict per run, holding the run name, its
+                        parameters and the columns of the metrics, also
+                        written to <runs_dir>/analysis.csv.
+    """
+    metrics = {name: METRICS[name] for name in (METRICS if metrics is None else metrics)}
+
+    cache_dir = None
+    if cache:
+        cache_dir = os.path.join(runs_dir, ANALYSIS_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    runs = [Run(sim_dir) for sim_dir in find_runs(runs_dir)]
+
+    def row(run):
+        return {"run": run.name, **run.params, **evaluate(run, metrics, cache_dir)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        table = list(executor.map(row, runs))
+
+    write_table(table, os.path.join(runs_dir, TABLE))
+
+    return table
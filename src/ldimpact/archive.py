@@ -0,0 +1,258 @@
+"""archive -- Consolidated single-file archive of a workspace directory.
+
+The fac values manager writes 181 small .ascii files per run, which weighs
+on the metadata server of a shared filesystem when hundreds of runs are
+stored. The packer converts a workspace directory res/workspace/<s_name>
+into the single file res/workspace/<s_name>.zip, and the reader gives
+back the same Workspace object as loader.load_workspace().
+
+The archive is a compressed zip container, laid out like a Zarr store:
+    manifest.json      -- fields, ring/curve layout, chunking
+    layout.json        -- ring layout written by the template
+    tSample.npy        -- time axis of every dataset
+    {field}_ring{r}/{k}.npy -- k-th chunk of frames of one ring
+Each ring dataset holds the values of the unique nodes of the ring, of
+shape (n_time, n_unique), so that the end nodes shared by its curves are
+stored once. The nodes of each curve are located by loader.ring_node_map().
+The datasets are split along the time axis in chunks of chunk_size frames,
+so that a time window only decompresses the chunks it overlaps.
+
+Archives written before the ring datasets hold one dataset per curve,
+{field}_curve{c}_ring{r}/{k}.npy, and are still read.
+
+Usage:
+    from ldimpact.archive import pack_workspace
+    pack_workspace("res/workspace/<s_name>", remove=True)
+"""
+
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from .cache import CACHE_DIR, clear_cache
+from .loader import LAYOUT, Workspace, discover, load_workspace, ring_node_map, ring_values
+from .rowindex import INDEX
+
+ARCHIVE_EXT = ".zip"
+MANIFEST = "manifest.json"
+
+
+def archive_path(sim_dir):
+    """archive_path -- Path of the archive of a workspace directory.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        path (str) -- Path of the consolidated archive.
+    """
+    return os.path.normpath(sim_dir) + ARCHIVE_EXT
+
+
+def pack_workspace(sim_dir, chunk_size=64, remove=False):
+    """pack_workspace -- Pack a workspace directory into one archive file.
+
+    Arguments:
+        sim_dir    (str)  -- Path of the simulation results.
+        chunk_size (int)  -- Number of frames per stored chunk.
+        remove     (bool) -- Remove the packed files once packed, with their
+                             binary cache and row index, and the workspace
+                             directory if nothing else is left in it.
+    Return:
+        path (str) -- Path of the written archive.
+    """
+    ws = load_workspace(sim_dir)
+    path = archive_path(sim_dir)
+
+    manifest = {
+        "fields": list(ws.fields),
+        "n_nodes": ws.n_nodes.tolist(),
+        "n_time": ws.n_time,
+        "chunk_size": chunk_size,
+        "node_unique": True,
+    }
+
+    # Write aside and rename, so that a reader never sees a partial archive
+    with zipfile.ZipFile(path + ".tmp", "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(MANIFEST, json.dumps(manifest))
+        if os.path.isfile(os.path.join(sim_dir, LAYOUT)):
+            zf.write(os.path.join(sim_dir, LAYOUT), LAYOUT)
+        _write_npy(zf, "tSample.npy", ws.t_sample)
+        for field in ws.fields:
+            for i_ring in range(ws.n_ring):
+                values = ws.ring(field, i_ring)
+                for i_chunk, i0 in enumerate(range(0, ws.n_time, chunk_size)):
+                    name = _ring_chunk_name(field, i_ring, i_chunk)
+                    _write_npy(zf, name, values[i0:i0+chunk_size])
+    os.replace(path + ".tmp", path)
+
+    if remove:
+        # Only the packed files, the workspace may hold other results
+        packed = list(discover(sim_dir).values()) + [os.path.join(sim_dir, name) for name in ("tSample.ascii", LAYOUT)]
+        for packed_path in packed:
+            if os.path.isfile(packed_path):
+                os.remove(packed_path)
+
+        # The cache and the row index are derived from the removed files
+        cache_dir = os.path.join(sim_dir, CACHE_DIR)
+        clear_cache(sim_dir)
+        if os.path.isfile(os.path.join(cache_dir, INDEX)):
+            os.remove(os.path.join(cache_dir, INDEX))
+        if os.path.isdir(cache_dir) and not os.listdir(cache_dir):
+            os.rmdir(cache_dir)
+
+        if not os.listdir(sim_dir):
+            os.rmdir(sim_dir)
+
+    return path
+
+
+def is_packed(sim_dir):
+    """is_packed -- Whether the results of a workspace are read from its archive.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        packed (bool) -- True if the archive exists and the .ascii files
+                         were removed from the workspace directory.
+    """
+    return os.path.isfile(archive_path(sim_dir)) and not os.path.isfile(os.path.join(sim_dir, "tSample.ascii"))
+
+
+class Archive():
+    """Archive -- Reader of a consolidated workspace archive.
+
+    Attributes:
+        t_sample   (ndarray) -- Time sample of the simulation recordings.
+        fields     (tuple)   -- Names of the archived fields.
+        n_nodes    (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+        n_time     (int)     -- Number of archived frames.
+        chunk_size (int)     -- Number of frames per stored chunk.
+        node_unique (bool)   -- Whether the values are stored per ring, on
+                                the unique nodes, rather than per curve.
+        layout     (dict)    -- Ring layout written by the template, or None.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._zf = zipfile.ZipFile(path)
+
+        manifest = json.loads(self._zf.read(MANIFEST))
+        self.fields = tuple(manifest["fields"])
+        self.n_nodes = np.array(manifest["n_nodes"], dtype=np.intp)
+        self.n_time = manifest["n_time"]
+        self.chunk_size = manifest["chunk_size"]
+        self.node_unique = manifest.get("node_unique", False)
+        self.t_sample = self._read_npy("tSample.npy")
+        self.layout = json.loads(self._zf.read(LAYOUT)) if LAYOUT in self._zf.namelist() else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zf.close()
+
+    def read(self, field, i_ring, i_curve, start=0, stop=None):
+        """read -- Read a window of frames of one field, for one curve.
+
+        Only the chunks that overlap the [start, stop) window are decompressed.
+
+        Arguments:
+            field   (str) -- Archived nodal field, e.g. "GV_TX".
+            i_ring  (int) -- Zero-based index of the ring.
+            i_curve (int) -- Zero-based index of the curve.
+            start   (int) -- First frame of the window.
+            stop    (int) -- Frame following the window, defaults to the last one.
+        Return:
+            values (ndarray) -- Nodal values of the curve, (stop-start, n_nodes).
+        """
+        if self.node_unique:
+            node_map = ring_node_map(self.n_nodes[i_ring])
+            return self.read_ring(field, i_ring, start, stop)[:, node_map[i_curve]]
+
+        return self._read_window(lambda i_chunk: _chunk_name(field, i_ring, i_curve, i_chunk),
+                                 self.n_nodes[i_ring, i_curve], start, stop)
+
+    def read_ring(self, field, i_ring, start=0, stop=None):
+        """read_ring -- Read a window of frames of one field, for the unique nodes of one ring.
+
+        Arguments:
+            field  (str) -- Archived nodal field, e.g. "GV_TX".
+            i_ring (int) -- Zero-based index of the ring.
+            start  (int) -- First frame of the window.
+            stop   (int) -- Frame following the window, defaults to the last one.
+        Return:
+            values (ndarray) -- Nodal values of the ring, (stop-start, n_unique).
+        """
+        node_map = ring_node_map(self.n_nodes[i_ring])
+        if not self.node_unique:
+            curve_values = [self.read(field, i_ring, i_curve, start, stop) for i_curve in range(len(node_map))]
+            return ring_values(curve_values, node_map)
+
+        n_unique = 1 + max(int(indexes.max()) for indexes in node_map)
+        return self._read_window(lambda i_chunk: _ring_chunk_name(field, i_ring, i_chunk),
+                                 n_unique, start, stop)
+
+    def _read_window(self, chunk_name, n_values, start, stop):
+        start, stop, _ = slice(start, stop).indices(self.n_time)
+        stop = max(start, stop)
+        first, last = start // self.chunk_size, -(-stop // self.chunk_size)
+
+        chunks = [self._read_npy(chunk_name(i_chunk)) for i_chunk in range(first, last)]
+        if not chunks:
+            return np.empty((0, n_values))
+
+        offset = first * self.chunk_size
+        return np.concatenate(chunks)[start-offset:stop-offset]
+
+    def to_workspace(self):
+        """to_workspace -- Decompress the whole archive.
+
+        Return:
+            ws (Workspace) -- Archived nodal values of the whole problem.
+        """
+        n_ring, n_curve = self.n_nodes.shape
+        data = np.full((len(self.fields), n_ring, n_curve, self.n_time, self.n_nodes.max()), np.nan)
+        for i_field, field in enumerate(self.fields):
+            for i_ring in range(n_ring):
+                values = self.read_ring(field, i_ring)
+                for i_curve, indexes in enumerate(ring_node_map(self.n_nodes[i_ring])):
+                    data[i_field, i_ring, i_curve, :, :indexes.size] = values[:, indexes]
+
+        return Workspace(self.t_sample, self.fields, self.n_nodes, data)
+
+    def _read_npy(self, name):
+        with self._zf.open(name) as member:
+            return np.lib.format.read_array(io.BytesIO(member.read()))
+
+
+def read_archive(path):
+    """read_archive -- Load all the nodal values of a workspace archive.
+
+    Argument:
+        path (str) -- Path of the consolidated archive.
+    Return:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    """
+    with Archive(path) as archive:
+        return archive.to_workspace()
+
+
+def _chunk_name(field, i_ring, i_curve, i_chunk):
+    return f"{field}_curve{i_curve+1}_ring{i_ring+1}/{i_chunk:05d}.npy"
+
+
+def _ring_chunk_name(field, i_ring, i_chunk):
+    return f"{field}_ring{i_ring+1}/{i_chunk:05d}.npy"
+
+
+def _write_npy(zf, name, array):
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, np.ascontiguousarray(array))
+    zf.writestr(name, buffer.getvalue())
+
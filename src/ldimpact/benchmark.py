@@ -0,0 +1,414 @@
+"""benchmark -- Performance benchmarks of the Metafor description files.
+
+The benchmarks are run within the Python interpreter of Metafor, as they
+build or run the template, and write their report as a JSON file, so that
+successive runs can be compared. A report holds the context of the run and
+a list of records, one per benchmarked point. check_regression() compares
+the records of a report with those of a stored baseline report.
+
+Usage, within the Python interpreter of Metafor:
+    from ldimpact.benchmark import bench_mesh_scaling, check_baseline
+    report = bench_mesh_scaling("src/template.py", "res/workspace/bench_mesh")
+    regressions = check_baseline(report, "res/bench/mesh_scaling.json")
+
+The thread-scaling benchmark feeds the tuner of the sweep runner:
+    report = bench_thread_scaling("src/template.py", "res/workspace/bench_tbb")
+    write_report(tune_threads(report), "res/bench/tuning.json")
+    run_sweep("src/template.py", cases, sweep_dir, tuning="res/bench/tuning.json")
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .scene import packed_scene
+from .sweep import load_description, resolve_params, run_case
+
+# TBB switches of the template, see p['use_tbb']
+TBB_SWITCHES = ("vector", "matrix", "contact")
+
+# Build profile written by the template, see p['profile']
+PROFILE = "profile.json"
+
+# Relative increase of each metric over its baseline value, beyond which
+# a record is reported as a regression
+TOLERANCES = {
+    "wall_time": 0.25,
+    "peak_rss": 0.10,
+    "n_steps": 0.0,
+    "n_nodes": 0.0,
+    "n_elements": 0.0,
+    "output_bytes": 0.05,
+    "contact_build_time": 0.25,
+}
+
+
+def bench_scene_build(description, n_rings=(3, 10, 30, 100), repeat=3, **kwargs):
+    """bench_scene_build -- Model build time against the number of rings.
+
+    Each scene is built by getMetafor(p) from a freshly imported description
+    file, so that no build is served from the cache of the previous one.
+
+    Arguments:
+        description (str)  -- Path of the Metafor description file.
+        n_rings     (list) -- Numbers of rings of the benchmarked scenes.
+        repeat      (int)  -- Number of builds per scene.
+        kwargs             -- Options of scene.packed_scene().
+    Return:
+        report (dict) -- Benchmark metadata, and one record per scene with
+                         its number of rings and contacts, the number of
+                         interactions created and the build times [s].
+    """
+    records = []
+    for n_ring in n_rings:
+        p = packed_scene(n_ring, **kwargs)
+
+        build_times = []
+        for _ in range(repeat):
+            module = load_description(description)
+            tic = time.perf_counter()
+            module.getMetafor(p)
+            build_times.append(time.perf_counter() - tic)
+
+        records.append({
+            "n_ring": n_ring,
+            "n_contact": len(p["contacts"]),
+            "n_interaction": module.Ring.id_interaction - 1 if hasattr(module, "Ring") else None,
+            "build_time_min": min(build_times),
+            "build_time_mean": sum(build_times) / repeat,
+        })
+
+    return {**report_metadata(description), "benchmark": "scene_build", "records": records}
+
+
+def bench_mesh_scaling(description, bench_dir, mesh_mults=(1, 2, 3, 4), final_time=1E-4, repeat=1, p=None):
+    """bench_mesh_scaling -- Cost of a run against the mesh refinement.
+
+    The description file is run once per mesh multiplier and repetition,
+    one run at a time so that the timings do not interfere, each in a fresh
+    process so that its peak memory is its own.
+
+    The time spent on the contacts is taken from the build profile of the
+    runs, see contact_build_time(). The contact search performed at each
+    step is part of the integration loop of Metafor, that is timed as a
+    whole, and is included in the wall time only.
+
+    Arguments:
+        description (str)   -- Path of the Metafor description file.
+        bench_dir   (str)   -- Directory holding the run workspaces.
+        mesh_mults  (list)  -- Values of p['mesh_mult'] to benchmark.
+        final_time  (float) -- Simulated time of each run, kept short.
+        repeat      (int)   -- Number of runs per mesh multiplier.
+        p           (dict)  -- Other parameters given to getMetafor(p).
+    Return:
+        report (dict) -- Benchmark metadata, and one record per mesh
+                         multiplier with the mesh size, best wall time [s],
+                         peak memory [bytes], number of time steps, output
+                         volume [bytes] and best contact build time [s] of
+                         the runs.
+    """
+    description = os.path.abspath(description)
+    module = load_description(description)
+
+    records = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, context, max_tasks_per_child=1) as executor:
+        for mesh_mult in mesh_mults:
+            case_p = {**(p or {}), "mesh_mult": mesh_mult, "final_time": final_time, "n_tasks": 1, "profile": True}
+            case_dir = os.path.abspath(os.path.join(bench_dir, f"mesh_mult{mesh_mult}"))
+            os.makedirs(case_dir, exist_ok=True)
+
+            outcomes, contact_times = [], []
+            for _ in range(repeat):
+                # A failed run must not leave the profile of the previous one
+                if os.path.isfile(os.path.join(case_dir, PROFILE)):
+                    os.remove(os.path.join(case_dir, PROFILE))
+                outcomes.append(executor.submit(run_case, description, case_p, case_dir).result())
+                contact_times.append(contact_build_time(case_dir))
+
+            failed = [outcome["status"] for outcome in outcomes if outcome["status"] != "ok"]
+            records.append({
+                "mesh_mult": mesh_mult,
+                **mesh_size(resolve_params(module, case_p)),
+                "status": failed[0] if failed else "ok",
+                "wall_time": min(outcome["wall_time"] for outcome in outcomes),
+                "peak_rss": max((outcome["peak_rss"] or 0) for outcome in outcomes) or None,
+                "n_steps": outcomes[-1]["n_steps"],
+                "output_bytes": output_volume(case_dir),
+                "contact_build_time": min((time for time in contact_times if time is not None), default=None),
+            })
+
+    return {
+        **report_metadata(description), "benchmark": "mesh_scaling",
+        "final_time": final_time, "records": records,
+    }
+
+
+def bench_thread_scaling(description, bench_dir, n_tasks=None, mesh_mults=(1, 3), final_time=1E-4, switches=None, p=None):
+    """bench_thread_scaling -- Strong scaling of a run against the number of threads.
+
+    The description file is run for every combination of mesh multiplier,
+    TBB switches and number of threads, one run at a time.
+
+    Arguments:
+        description (str)   -- Path of the Metafor description file.
+        bench_dir   (str)   -- Directory holding the run workspaces.
+        n_tasks     (list)  -- Numbers of threads to benchmark, defaults to
+                               the powers of two up to the number of cores.
+        mesh_mults  (list)  -- Values of p['mesh_mult'] to benchmark.
+        final_time  (float) -- Simulated time of each run, kept short.
+        switches    (list)  -- p['use_tbb'] dicts to benchmark, defaults to
+                               all the combinations of TBB_SWITCHES.
+        p           (dict)  -- Other parameters given to getMetafor(p).
+    Return:
+        report (dict) -- Benchmark metadata, and one record per run with its
+                         mesh multiplier, TBB switches, number of threads,
+                         wall time [s], speedup and parallel efficiency over
+                         the single-threaded run of the same switches, NaN
+                         if either run failed.
+    """
+    description = os.path.abspath(description)
+    if n_tasks is None:
+        cpu_count = os.cpu_count() or 1
+        n_tasks = [2**k for k in range(cpu_count.bit_length()) if 2**k < cpu_count] + [cpu_count]
+    if switches is None:
+        switches = [
+            dict(zip(TBB_SWITCHES, values))
+            for values in itertools.product((False, True), repeat=len(TBB_SWITCHES))
+        ]
+    n_tasks = sorted(set(n_tasks) | {1})
+
+    records = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, context, max_tasks_per_child=1) as executor:
+        for mesh_mult, use_tbb in itertools.product(mesh_mults, switches):
+            label = "_".join(name for name in TBB_SWITCHES if use_tbb[name]) or "serial"
+            for n in n_tasks:
+                case_p = {**(p or {}), "mesh_mult": mesh_mult, "final_time": final_time,
+                          "use_tbb": use_tbb, "n_tasks": n}
+                case_dir = os.path.abspath(os.path.join(bench_dir, f"mesh_mult{mesh_mult}_{label}_{n}"))
+                os.makedirs(case_dir, exist_ok=True)
+                outcome = executor.submit(run_case, description, case_p, case_dir).result()
+                records.append({
+                    "mesh_mult": mesh_mult, "use_tbb": use_tbb, "n_tasks": n,
+                    "status": outcome["status"], "wall_time": outcome["wall_time"],
+                })
+
+    # Strong scaling over the single-threaded run of the same switches
+    serial = {
+        (record["mesh_mult"], json.dumps(record["use_tbb"], sort_keys=True)): record["wall_time"]
+        for record in records if record["n_tasks"] == 1 and record["status"] == "ok"
+    }
+    for record in records:
+        key = (record["mesh_mult"], json.dumps(record["use_tbb"], sort_keys=True))
+        if record["status"] != "ok" or key not in serial:
+            record["speedup"] = record["efficiency"] = float("nan")
+            continue
+        record["speedup"] = serial[key] / record["wall_time"]
+        record["efficiency"] = record["speedup"] / record["n_tasks"]
+
+    return {
+        **report_metadata(description), "benchmark": "thread_scaling",
+        "final_time": final_time, "records": records,
+    }
+
+
+def tune_threads(report, cpu_count=None):
+    """tune_threads -- Best parallel configuration per mesh size, for a sweep.
+
+    A sweep of many cases on a node of cpu_count cores runs cpu_count // n
+    cases at once with n threads each. The best configuration is the one
+    of highest throughput, i.e. (cpu_count // n) / wall_time cases per second.
+
+    Arguments:
+        report    (dict) -- Report of bench_thread_scaling().
+        cpu_count (int)  -- Number of cores of the node running the sweeps,
+                            defaults to the one of the benchmark.
+    Return:
+        tuning (dict) -- Benchmark metadata, and one record per mesh
+                         multiplier with its best TBB switches, number of
+                         threads per case and number of concurrent cases.
+    """
+    if cpu_count is None:
+        cpu_count = report["cpu_count"]
+
+    best = {}
+    for record in report["records"]:
+        if record["status"] != "ok" or record["n_tasks"] > cpu_count:
+            continue
+        max_workers = cpu_count // record["n_tasks"]
+        throughput = max_workers / record["wall_time"]
+        if record["mesh_mult"] not in best or throughput > best[record["mesh_mult"]]["throughput"]:
+            best[record["mesh_mult"]] = {
+                "mesh_mult": record["mesh_mult"], "use_tbb": record["use_tbb"],
+                "n_tasks": record["n_tasks"], "max_workers": max_workers,
+                "throughput": throughput,
+            }
+
+    return {
+        **{key: value for key, value in report.items() if key not in ("benchmark", "records")},
+        "benchmark": "thread_tuning", "cpu_count": cpu_count,
+        "records": [best[mesh_mult] for mesh_mult in sorted(best)],
+    }
+
+
+def mesh_size(p):
+    """mesh_size -- Numbers of nodes and elements of the template mesh.
+
+    Each ring is an annulus of two transfinite sides, meshed with
+    nelem_radial elements across its thickness and nelem_contour_coarse
+    plus nelem_contour_fine elements along its contour, all multiplied by
+    p['mesh_mult'].
+
+    Argument:
+        p (dict) -- Resolved parameters of the template.
+    Return:
+        size (dict) -- Numbers of nodes and elements of all the rings.
+    """
+    n_nodes, n_elements = 0, 0
+    for ring in p["rings"]:
+        n_radial = ring["nelem_radial"] * p["mesh_mult"]
+        n_contour = (ring["nelem_contour_coarse"] + ring["nelem_contour_fine"]) * p["mesh_mult"]
+        n_nodes += (n_radial + 1) * n_contour
+        n_elements += n_radial * n_contour
+
+    return {"n_nodes": n_nodes, "n_elements": n_elements}
+
+
+def contact_build_time(sim_dir):
+    """contact_build_time -- Time spent on the contacts while building a run.
+
+    Argument:
+        sim_dir (str) -- Workspace directory of the run, holding its profile.
+    Return:
+        time (float) -- Total time of the contact phases of the build
+                        profile [s], or None without profile.
+    """
+    try:
+        profile = read_report(os.path.join(sim_dir, PROFILE))
+    except (OSError, ValueError):
+        return None
+
+    return sum(entry["time"] for phase, entry in profile["phases"].items() if "contact" in phase.lower())
+
+
+def output_volume(sim_dir):
+    """output_volume -- Size of the outputs written by a run.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        size (int) -- Total size of the .ascii files [bytes].
+    """
+    return sum(
+        entry.stat().st_size for entry in os.scandir(sim_dir)
+        if entry.is_file() and entry.name.endswith(".ascii")
+    )
+
+
+def check_regression(report, baseline, tolerances=None, key=None):
+    """check_regression -- Compare the records of a report with a baseline report.
+
+    Arguments:
+        report     (dict) -- Benchmark report.
+        baseline   (dict) -- Baseline report of the same benchmark.
+        tolerances (dict) -- Allowed relative increase of each metric,
+                             defaults to TOLERANCES.
+        key        (str)  -- Record entry matching the records of both
+                             reports, defaults to the first one.
+    Return:
+        regressions (list) -- Messages describing each metric that exceeds
+                              its tolerance, empty if none.
+    """
+    if report["benchmark"] != baseline["benchmark"]:
+        raise ValueError(f"Cannot compare {report['benchmark']} with a {baseline['benchmark']} baseline")
+    if tolerances is None:
+        tolerances = TOLERANCES
+    if key is None:
+        key = next(iter(report["records"][0]))
+
+    reference = {record[key]: record for record in baseline["records"]}
+
+    regressions = []
+    for record in report["records"]:
+        if record[key] not in reference:
+            continue
+        for metric, tolerance in tolerances.items():
+            value = record.get(metric)
+            ref_value = reference[record[key]].get(metric)
+            if value is None or ref_value is None:
+                continue
+            if value > ref_value * (1 + tolerance):
+                regressions.append(
+                    f"{key}={record[key]}: {metric} {value:.4g} > {ref_value:.4g} (+{tolerance:.0%})"
+                )
+
+    return regressions
+
+
+def check_baseline(report, baseline_path, tolerances=None, update=False):
+    """check_baseline -- Compare a report with the baseline stored in a file.
+
+    The report becomes the baseline if there is none yet, or if asked to.
+
+    Arguments:
+        report        (dict) -- Benchmark report.
+        baseline_path (str)  -- Path of the baseline JSON file.
+        tolerances    (dict) -- Allowed relative increase of each metric.
+        update        (bool) -- Store the report as the new baseline.
+    Return:
+        regressions (list) -- Messages describing each regression.
+    """
+    regressions = []
+    if os.path.isfile(baseline_path):
+        regressions = check_regression(report, read_report(baseline_path), tolerances)
+
+    if update or not os.path.isfile(baseline_path):
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        write_report(report, baseline_path)
+
+    return regressions
+
+
+def report_metadata(description):
+    """report_metadata -- Context of a benchmark run.
+
+    Argument:
+        description (str) -- Path of the benchmarked description file.
+    Return:
+        metadata (dict) -- Description file, host, Python version and date.
+    """
+    return {
+        "description": os.path.abspath(description),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write_report(report, path):
+    """write_report -- Write a benchmark report as a JSON file.
+
+    Arguments:
+        report (dict) -- Benchmark report.
+        path   (str)  -- Path of the JSON file.
+    """
+    with open(path, "w") as file:
+        json.dump(report, file, indent=4)
+
+
+def read_report(path):
+    """read_report -- Read a benchmark report from a JSON file.
+
+    Argument:
+        path (str) -- Path of the JSON file.
+    Return:
+        report (dict) -- Benchmark report.
+    """
+    with open(path) as file:
+        return json.load(file)
@@ -0,0 +1,165 @@
+"""cache -- Binary sidecar cache of the parsed workspace outputs.
+
+The first parse of a workspace directory writes the Workspace arrays as
+.npy files in a .cache/ subdirectory, together with a manifest holding the
+modification time and size of every parsed .ascii file. The next loads
+return zero-copy, read-only np.memmap views on these files, as long as the
+manifest still matches the .ascii files on disk. As soon as Metafor
+rewrites one of them, or adds or removes one, the cache is rebuilt.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+from .loader import Workspace, discover, load_workspace
+
+CACHE_DIR = ".cache"
+MANIFEST = "manifest.json"
+
+# Workspace attributes stored as .npy files
+_ARRAYS = ("t_sample", "n_nodes", "data")
+
+# File creation mask, applied to the temporary files of replace_file()
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def load_workspace_cached(sim_dir, max_workers=None):
+    """load_workspace_cached -- Load a workspace directory through its binary cache.
+
+    Arguments:
+        sim_dir     (str) -- Path of the simulation results.
+        max_workers (int) -- Number of parsing threads, on a cache miss.
+    Return:
+        ws (Workspace) -- Archived nodal values, memory-mapped from the cache,
+                          or parsed in memory if the cache cannot be written.
+    """
+    cache_dir = os.path.join(sim_dir, CACHE_DIR)
+    stats = _stat_sources(sim_dir)
+
+    manifest = _read_manifest(cache_dir)
+    if manifest is None or manifest["sources"] != stats:
+        ws = load_workspace(sim_dir, max_workers)
+        try:
+            write_cache(cache_dir, ws, stats)
+        except OSError as error:
+            # Read-only or shared workspace, the workspace is only kept in memory
+            warnings.warn(f"Cannot write the cache of {sim_dir}: {error}")
+            return ws
+        manifest = _read_manifest(cache_dir)
+        if manifest is None:
+            # Being rewritten by another process
+            return ws
+
+    arrays = {
+        name: np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r")
+        for name in _ARRAYS
+    }
+
+    return Workspace(arrays["t_sample"], manifest["fields"], arrays["n_nodes"], arrays["data"])
+
+
+def write_cache(cache_dir, ws, stats):
+    """write_cache -- Write the binary cache of a parsed workspace.
+
+    The manifest is written last, and atomically, so that an interrupted
+    write leaves a cache that is seen as stale rather than corrupted. The
+    arrays are written aside and renamed as well, so that the memmaps of a
+    previous load, possibly held by another process, keep their own file
+    rather than seeing it truncated.
+
+    Arguments:
+        cache_dir (str)       -- Path of the cache directory.
+        ws        (Workspace) -- Parsed workspace to cache.
+        stats     (dict)      -- Modification time and size of the parsed files.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    for name in _ARRAYS:
+        with replace_file(os.path.join(cache_dir, name + ".npy"), "wb") as file:
+            np.save(file, np.ascontiguousarray(getattr(ws, name)))
+
+    manifest = {"fields": list(ws.fields), "sources": stats}
+    with replace_file(manifest_path, "w") as file:
+        json.dump(manifest, file)
+
+
+@contextlib.contextmanager
+def replace_file(path, mode="w"):
+    """replace_file -- Write a file aside, then rename it over its path.
+
+    The temporary file is unique to each writer, so that the processes and
+    threads writing the same file concurrently do not mix their contents:
+    the last one to finish replaces the file as a whole.
+
+    Arguments:
+        path (str) -- Path of the file to replace.
+        mode (str) -- Opening mode of the temporary file, "w" or "wb".
+    Return:
+        file (file object) -- Temporary file, renamed over path on exit.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as file:
+            # mkstemp creates the file readable by its owner only
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            yield file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def clear_cache(sim_dir):
+    """clear_cache -- Remove the binary cache of a workspace directory.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    """
+    cache_dir = os.path.join(sim_dir, CACHE_DIR)
+    for name in [MANIFEST] + [name + ".npy" for name in _ARRAYS]:
+        path = os.path.join(cache_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _stat_sources(sim_dir):
+    """_stat_sources -- Modification time and size of the .ascii files of a workspace.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        stats (dict) -- Map each file name to its [mtime_ns, size].
+    """
+    paths = list(discover(sim_dir).values()) + [os.path.join(sim_dir, "tSample.ascii")]
+
+    stats = {}
+    for path in paths:
+        stat = os.stat(path)
+        stats[os.path.basename(path)] = [stat.st_mtime_ns, stat.st_size]
+
+    return stats
+
+
+def _read_manifest(cache_dir):
+    """_read_manifest -- Read the manifest of a cache directory, if any.
+
+    Argument:
+        cache_dir (str) -- Path of the cache directory.
+    Return:
+        manifest (dict) -- Cache manifest, or None if missing or unreadable.
+    """
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
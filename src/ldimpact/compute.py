@@ -0,0 +1,224 @@
+"""compute -- Compute the post-processed quantities of a simulation.
+
+Python counterpart of the src/pprocess/compute_*.m functions.
+
+Every function works on the nested lists returned by
+extract.extract_nodal_values(), indexed as [i_ring][i_curve], whose leaves
+are NumPy arrays of shape (n_time, n_nodes). The reductions over the nodes
+are vectorized over all the archived times at once.
+
+The curves of a ring share their end nodes. The ring averages are taken
+over the unique nodes of the ring, see loader.ring_node_map().
+"""
+
+import numpy as np
+
+from .loader import ring_node_map, ring_values
+
+
+def compute_displacements(geom):
+    """compute_displacements -- Compute the displacements of the geometry.
+
+    Argument:
+        geom (list) -- Geometrical data of the whole problem.
+    Return:
+        displ (list) -- Displacements of the rings.
+    """
+    return [
+        [
+            {
+                "tx": geom_curve["tx"]["ab"] + geom_curve["tx"]["re"],
+                "ty": geom_curve["ty"]["ab"] + geom_curve["ty"]["re"],
+            }
+            for geom_curve in geom_ring
+        ]
+        for geom_ring in geom
+    ]
+
+
+def compute_perimeters(displ):
+    """compute_perimeters -- Compute the perimeters and areas of the rings.
+
+    The inner and outer contours of all the rings are measured at once, see
+    ring_contours() and contour_measures(). Besides the perimeters, the
+    areas enclosed by the contours and the area of the ring section, i.e.
+    the area of the material, are computed. As the rings are nearly
+    incompressible, the variation of their section area is an indicator of
+    the volumetric locking of their elements.
+
+    Argument:
+        displ (list) -- Displacements of the rings.
+    Return:
+        perim (list) -- Perimeters and areas of the rings.
+    """
+    perimeter, area = contour_measures(ring_contours(displ))
+    section = area[:, 1] - area[:, 0]
+
+    return [
+        {
+            "inner": perimeter[i_ring, 0],
+            "outer": perimeter[i_ring, 1],
+            "inner_diff": relative_decrease(perimeter[i_ring, 0]),
+            "outer_diff": relative_decrease(perimeter[i_ring, 1]),
+            "inner_area": area[i_ring, 0],
+            "outer_area": area[i_ring, 1],
+            "section": section[i_ring],
+            "section_diff": relative_decrease(section[i_ring]),
+        }
+        for i_ring in range(len(displ))
+    ]
+
+
+def ring_contours(displ):
+    """ring_contours -- Inner and outer contours of all the rings, as one array.
+
+    The inner contour of a ring joins its curves 1 and 2, and the outer one
+    its curves 3 and 4, see loader.CURVE_ENDS. As the rings do not hold the
+    same number of nodes, the contours are padded by repeating their last
+    vertex, which neither lengthens them nor changes their area.
+
+    Argument:
+        displ (list) -- Displacements of the rings.
+    Return:
+        contours (ndarray) -- Coordinates of the contour vertices,
+                              (n_ring, 2, 2, n_time, n_vertex), indexed as
+                              [i_ring, inner/outer, x/y, i_time, i_vertex].
+    """
+    contours = [
+        np.stack([
+            np.stack([np.hstack((displ_ring[first][key], displ_ring[last][key])) for key in ("tx", "ty")])
+            for first, last in ((0, 1), (2, 3))
+        ])
+        for displ_ring in displ
+    ]
+    n_vertex = max(contour.shape[-1] for contour in contours)
+
+    return np.stack([
+        np.pad(contour, [(0, 0)] * (contour.ndim - 1) + [(0, n_vertex - contour.shape[-1])], mode="edge")
+        for contour in contours
+    ])
+
+
+def contour_measures(contours):
+    """contour_measures -- Perimeters and enclosed areas of closed contours.
+
+    Every leading axis is batched, so that all the contours of all the rings
+    are measured at all the archived times in one pass.
+
+    Argument:
+        contours (ndarray) -- Coordinates of the contour vertices,
+                              (..., 2, n_vertex), see ring_contours().
+    Return:
+        perimeter (ndarray) -- Perimeters of the contours, (...).
+        area      (ndarray) -- Areas enclosed by the contours (shoelace
+                               formula), (...).
+    """
+    x, y = contours[..., 0, :, :], contours[..., 1, :, :]
+    x_next, y_next = np.roll(x, -1, axis=-1), np.roll(y, -1, axis=-1)
+
+    perimeter = np.hypot(x_next - x, y_next - y).sum(axis=-1)
+    area = 0.5 * np.abs((x*y_next - x_next*y).sum(axis=-1))
+
+    return perimeter, area
+
+
+def relative_decrease(values):
+    """relative_decrease -- Decrease of values relative to their first one.
+
+    Argument:
+        values (ndarray) -- Evolution of a quantity, (n_time,).
+    Return:
+        diff (ndarray) -- Relative decrease of the quantity, (n_time,).
+    """
+    return (values[0] - values) / values[0]
+
+
+def compute_external_forces(nfext):
+    """compute_external_forces -- Compute the external forces applied on the rings.
+
+    Argument:
+        nfext (list) -- Nodal external forces.
+    Return:
+        fext (list) -- External forces applied on the rings.
+    """
+    fext = [None] * len(nfext)
+
+    for i_ring, nfext_ring in enumerate(nfext):
+        fext_ring = {
+            "tx": sum(nfext_curve["tx"].sum(axis=1) for nfext_curve in nfext_ring),
+            "ty": sum(nfext_curve["ty"].sum(axis=1) for nfext_curve in nfext_ring),
+        }
+        fext_ring["abs"] = np.hypot(fext_ring["tx"], fext_ring["ty"])
+        fext_ring["angle_deg"] = np.degrees(np.arctan2(fext_ring["ty"], fext_ring["tx"]))
+        fext[i_ring] = fext_ring
+
+    return fext
+
+
+def compute_mean_motion(nspeed, displ):
+    """compute_mean_motion -- Compute the velocity and displacement of the ring CGs.
+
+    Arguments:
+        nspeed (list) -- Nodal speeds.
+        displ  (list) -- Displacements of the rings.
+    Return:
+        mspeed (list) -- Mean speeds.
+        mdispl (list) -- Mean displacements.
+    """
+    mspeed = [_mean_of_ring_nodes(nspeed_ring) for nspeed_ring in nspeed]
+    mdispl = [_mean_of_ring_nodes(displ_ring) for displ_ring in displ]
+
+    return mspeed, mdispl
+
+
+def _mean_of_ring_nodes(values_ring):
+    """_mean_of_ring_nodes -- Average the nodal values of one ring.
+
+    Argument:
+        values_ring (list) -- Nodal values of the ring, with "tx" and "ty" keys.
+    Return:
+        mean_ring (dict) -- Mean values of the ring.
+    """
+    mean_ring = {
+        "tx": _unique_nodes(values_ring, "tx").mean(axis=1),
+        "ty": _unique_nodes(values_ring, "ty").mean(axis=1),
+    }
+    mean_ring["abs"] = np.hypot(mean_ring["tx"], mean_ring["ty"])
+
+    return mean_ring
+
+
+def compute_kinetic(nspeed):
+    """compute_kinetic -- Compute the specific kinetic energy of the rings.
+
+    Argument:
+        nspeed (list) -- Nodal speeds.
+    Return:
+        node_count (list) -- Number of nodes of the rings.
+        kin        (list) -- Specific kinetic energies.
+    """
+    node_count = [0] * len(nspeed)
+    kin = [None] * len(nspeed)
+
+    for i_ring, nspeed_ring in enumerate(nspeed):
+        tx = _unique_nodes(nspeed_ring, "tx")
+        ty = _unique_nodes(nspeed_ring, "ty")
+        node_count[i_ring] = tx.shape[1]
+        kin[i_ring] = (tx**2 + ty**2).sum(axis=1) / node_count[i_ring]
+
+    return node_count, kin
+
+
+def _unique_nodes(values_ring, key):
+    """_unique_nodes -- Values of one ring on its unique nodes.
+
+    Arguments:
+        values_ring (list) -- Nodal values of the ring, one dict per curve.
+        key         (str)  -- Key of the values in the curve dicts, e.g. "tx".
+    Return:
+        values (ndarray) -- Values of the unique nodes, (n_time, n_unique).
+    """
+    curve_values = [values_curve[key] for values_curve in values_ring]
+    node_map = ring_node_map([values.shape[1] for values in curve_values])
+
+    return ring_values(curve_values, node_map)
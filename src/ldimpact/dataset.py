@@ -0,0 +1,227 @@
+"""dataset -- Lazy access to the frames of a workspace.
+
+open_workspace() loads every field of every frame, even when a plot only
+needs the frame of tFocus. A Dataset rather reads the time sample and the
+node counts on opening, and the nodal values only on demand:
+    ds.frames(i0, i1)       -- all the fields of the frames [i0, i1)
+    ds.at_time(t)           -- all the fields of the frame nearest to t
+    ds.field("GV", ring=1)  -- one field of one ring, at all the frames
+    ds.snapshot(t)          -- all the fields, interpolated at the times t
+Only the requested rows are decoded: the rows of the .ascii files are
+located by their row index, see rowindex.py, and read by one seek each,
+and the packed archives, see archive.py, only decompress the chunks that
+overlap the requested frames.
+
+Usage:
+    from ldimpact.dataset import Dataset
+    with Dataset("res/workspace/<s_name>") as ds:
+        ws = ds.at_time(7E-4)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .archive import Archive, archive_path, is_packed
+from .loader import FIELDS, Workspace, discover, parse_ascii, ring_node_map
+from .rowindex import RowIndex
+from .timequery import interpolate, locate
+
+
+class Dataset():
+    """Dataset -- Lazily loaded nodal values of one simulation.
+
+    Attributes:
+        sim_dir     (str)     -- Path of the simulation results.
+        t_sample    (ndarray) -- Time sample of the simulation recordings, (n_time,).
+        fields      (tuple)   -- Names of the archived fields.
+        n_nodes     (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+        max_workers (int)     -- Number of reading threads of frames().
+    """
+
+    def __init__(self, sim_dir, max_workers=None):
+        self.sim_dir = sim_dir
+        self.max_workers = max_workers
+
+        if is_packed(sim_dir):
+            self._archive = Archive(archive_path(sim_dir))
+            self._files = None
+            self.t_sample = self._archive.t_sample
+            self.fields = self._archive.fields
+            self.n_nodes = self._archive.n_nodes
+            return
+
+        self._archive = None
+        self._index = RowIndex(sim_dir, max_workers).update()
+        self._files = discover(sim_dir)
+        if not self._files:
+            raise FileNotFoundError(f"No curve .ascii file found in {sim_dir}")
+        self.t_sample = parse_ascii(os.path.join(sim_dir, "tSample.ascii")).ravel()
+
+        found = {field for field, _, _ in self._files}
+        self.fields = tuple([field for field in FIELDS if field in found] + sorted(found - set(FIELDS)))
+
+        keys = list(self._files)
+        self.n_nodes = np.zeros(
+            (1 + max(i_ring for _, i_ring, _ in keys), 1 + max(i_curve for _, _, i_curve in keys)),
+            dtype=np.intp,
+        )
+        for field, i_ring, i_curve in keys:
+            if field == self.fields[0]:
+                self.n_nodes[i_ring, i_curve] = _count_columns(self._files[field, i_ring, i_curve])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+    @property
+    def n_ring(self):
+        return self.n_nodes.shape[0]
+
+    @property
+    def n_curve(self):
+        return self.n_nodes.shape[1]
+
+    @property
+    def n_time(self):
+        return self.t_sample.size
+
+    def frames(self, i0=0, i1=None, fields=None):
+        """frames -- Read a window of frames.
+
+        Arguments:
+            i0     (int)   -- First frame of the window.
+            i1     (int)   -- Frame following the window, defaults to the last one.
+            fields (tuple) -- Fields to read, defaults to all.
+        Return:
+            ws (Workspace) -- Nodal values of the frames [i0, i1).
+        """
+        i0, i1, _ = slice(i0, i1).indices(self.n_time)
+        i1 = max(i0, i1)
+        fields = self.fields if fields is None else tuple(fields)
+
+        keys = [
+            (field, i_ring, i_curve)
+            for field in fields for i_ring in range(self.n_ring) for i_curve in range(self.n_curve)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            values = dict(zip(keys, executor.map(lambda key: self.read(*key, i0, i1), keys)))
+
+        # A running simulation may not have written all its files up to i1
+        n_time = min([i1 - i0] + [rows.shape[0] for rows in values.values()])
+
+        data = np.full((len(fields), self.n_ring, self.n_curve, n_time, self.n_nodes.max()), np.nan)
+        for (field, i_ring, i_curve), rows in values.items():
+            data[fields.index(field), i_ring, i_curve, :, :rows.shape[1]] = rows[:n_time]
+
+        return Workspace(self.t_sample[i0:i0+n_time], fields, self.n_nodes, data)
+
+    def at_time(self, t, fields=None):
+        """at_time -- Read the frame nearest to a time.
+
+        Arguments:
+            t      (float) -- Time of the frame [s].
+            fields (tuple) -- Fields to read, defaults to all.
+        Return:
+            ws (Workspace) -- Nodal values of the nearest frame.
+        """
+        i_frame = self.nearest_frame(t)
+
+        return self.frames(i_frame, i_frame+1, fields)
+
+    def snapshot(self, t, order=1, fields=None):
+        """snapshot -- Interpolate the frames at query times, see timequery.py.
+
+        Only the frames spanning the query times are read.
+
+        Arguments:
+            t      (ndarray) -- Query times [s], (n_query,).
+            order  (int)     -- Order of the interpolation, 1 or 3.
+            fields (tuple)   -- Fields to read, defaults to all.
+        Return:
+            ws (Workspace) -- Nodal values at the query times.
+        """
+        i_frame, _ = locate(self.t_sample, t)
+
+        return interpolate(self.frames(i_frame.min(), i_frame.max()+2, fields), t, order)
+
+    def nearest_frame(self, t):
+        """nearest_frame -- Index of the frame nearest to a time."""
+        if self.n_time < 2:
+            return 0
+
+        i_frame = int(np.clip(np.searchsorted(self.t_sample, t), 1, self.n_time-1))
+
+        return i_frame - int(t - self.t_sample[i_frame-1] <= self.t_sample[i_frame] - t)
+
+    def field(self, name, ring, curve=None, start=0, stop=None):
+        """field -- Read one field of one ring, or of one of its curves.
+
+        Arguments:
+            name  (str) -- Field, either one component, e.g. "GV_TX", or
+                           both, e.g. "GV".
+            ring  (int) -- One-based number of the ring, as in the file names.
+            curve (int) -- One-based number of the curve, defaults to the
+                           unique nodes of the whole ring.
+            start (int) -- First frame to read.
+            stop  (int) -- Frame following the last one to read, defaults to
+                           the last one.
+        Return:
+            values (ndarray) -- Nodal values, (n_time, n_nodes), or a dict of
+                                them under the "tx" and "ty" keys if both
+                                components were requested.
+        """
+        if name not in self.fields:
+            if name + "_TX" not in self.fields:
+                raise KeyError(f"Field {name} not archived, the archived fields are: {', '.join(self.fields)}")
+            return {
+                "tx": self.field(name + "_TX", ring, curve, start, stop),
+                "ty": self.field(name + "_TY", ring, curve, start, stop),
+            }
+
+        if curve is not None:
+            return self.read(name, ring-1, curve-1, start, stop)
+
+        if self._archive is not None:
+            return self._archive.read_ring(name, ring-1, start, stop)
+
+        node_map = ring_node_map(self.n_nodes[ring-1])
+        curve_values = [self.read(name, ring-1, i_curve, start, stop) for i_curve in range(len(node_map))]
+        n_time = min(values.shape[0] for values in curve_values)
+        values = np.full((n_time, 1 + max(int(indexes.max()) for indexes in node_map)), np.nan)
+        for indexes, curve_value in zip(node_map, curve_values):
+            values[:, indexes] = curve_value[:n_time]
+
+        return values
+
+    def read(self, field, i_ring, i_curve, start=0, stop=None):
+        """read -- Read a window of frames of one field, for one curve.
+
+        Arguments:
+            field   (str) -- Archived nodal field, e.g. "GV_TX".
+            i_ring  (int) -- Zero-based index of the ring.
+            i_curve (int) -- Zero-based index of the curve.
+            start   (int) -- First frame of the window.
+            stop    (int) -- Frame following the window, defaults to the last one.
+        Return:
+            values (ndarray) -- Nodal values of the curve, (stop-start, n_nodes).
+        """
+        if self._archive is not None:
+            return self._archive.read(field, i_ring, i_curve, start, stop)
+
+        start, stop, _ = slice(start, stop).indices(self.n_time)
+
+        return self._index.read(os.path.basename(self._files[field, i_ring, i_curve]), start, max(start, stop))
+
+
+def _count_columns(path):
+    """_count_columns -- Number of values per row of an .ascii file."""
+    with open(path, "rb") as file:
+        return len(file.readline().split())
@@ -0,0 +1,203 @@
+"""energy -- Energy accounting of the rings.
+
+compute.compute_kinetic() only returns the node-averaged squared speed of
+each ring, as the nodal masses are not archived. This module rather lumps
+the mass of each ring on its archived nodes, from the ring parameters saved
+in layout.json and the number of nodes of its curves, and computes for
+every ring and every frame:
+    kinetic  -- kinetic energy, 1/2 m v^2 summed over the nodes
+    ext_work -- work of the external forces (GF1), i.e. the contact forces
+    int_work -- work of the internal forces (GF2)
+    balance  -- energy balance, kinetic - kinetic[0] - ext_work + int_work,
+                from the equations of motion M a = GF1 - GF2
+All the rings are processed at once: their unique nodes are gathered into
+(n_ring, n_time, n_node) arrays, the smaller rings being padded with nodes
+of zero mass.
+
+The mesh of a ring, see Ring.build_mesh() of src/template.py, holds one
+column of quadrangles per element of the contour, whose nodes lie on the
+straight radial lines joining the inner and the outer contours. Each
+element mass is lumped in equal parts on its four nodes. Only the nodes of
+the curves are archived, so the mass of the interior nodes of a column is
+shared between its inner and outer node, in proportion to their distance
+to these contours. The interior nodes of the cutting lines then weigh
+nothing. The lumping only matches the one of Metafor for a single element
+through the thickness, whereas the reference mesh holds nelem_radial *
+mesh_mult = 3 of them. With more than one element through the thickness,
+the speeds and forces of the interior nodes are not archived, so that the
+kinetic energy, the works and above all the balance are approximate: the
+balance does not close exactly.
+
+Usage:
+    from ldimpact.energy import batch_energies
+    energies = batch_energies(["res/workspace/run1", "res/workspace/run2"])
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .extract import open_layout, open_workspace
+from .loader import ring_node_map
+
+# Curves of the inner and outer contours, see loader.CURVE_ENDS
+INNER = (0, 1)
+OUTER = (2, 3)
+
+
+def lumped_masses(layout, n_nodes):
+    """lumped_masses -- Lumped masses of the unique nodes of all the rings.
+
+    Arguments:
+        layout  (dict)    -- Ring layout of the simulation, see
+                             extract.open_layout().
+        n_nodes (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+    Return:
+        masses (ndarray) -- Nodal masses, per unit out-of-plane thickness,
+                            zero on the padding, (n_ring, n_node).
+    """
+    node_maps = [ring_node_map(n_nodes_ring) for n_nodes_ring in n_nodes]
+    n_node = max(1 + max(int(indexes.max()) for indexes in node_map) for node_map in node_maps)
+    masses = np.zeros((len(node_maps), n_node))
+
+    for i_ring, node_map in enumerate(node_maps):
+        ring = layout["rings"][i_ring]
+        ri, ro = ring["inner_radius"], ring["outer_radius"]
+
+        # Radii of the nodes of a column, and their weights on the inner contour
+        r = np.linspace(ri, ro, int(n_nodes[i_ring, 4]))
+        w = (ro - r) / (ro - ri)
+        layer = 0.5 * (r[1:]**2 - r[:-1]**2)
+        share_inner = (layer * (w[:-1] + w[1:])).sum() / 4
+        share_outer = (layer * (2 - w[:-1] - w[1:])).sum() / 4
+
+        # Upper arcs span 360-alpha degrees, lower arcs alpha degrees
+        spans = (2*math.pi - math.radians(ring["alpha"]), math.radians(ring["alpha"]))
+        for curves, share in ((INNER, share_inner), (OUTER, share_outer)):
+            for i_curve, span in zip(curves, spans):
+                indexes = node_map[i_curve]
+                n_elem = indexes.size - 1
+                element = ring["mass_density"] * math.sin(span / n_elem) * share
+                masses[i_ring, indexes[:-1]] += element
+                masses[i_ring, indexes[1:]] += element
+
+    return masses
+
+
+def unique_node_index(n_nodes):
+    """unique_node_index -- Location of the unique nodes of all the rings in the curves.
+
+    Argument:
+        n_nodes (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+    Return:
+        i_curve (ndarray) -- Curve holding each unique node, (n_ring, n_node).
+        i_node  (ndarray) -- Index of each unique node in its curve, (n_ring, n_node).
+        valid   (ndarray) -- Whether each node exists, False on the padding
+                             nodes of the smaller rings, (n_ring, n_node).
+    """
+    node_maps = [ring_node_map(n_nodes_ring) for n_nodes_ring in n_nodes]
+    n_node = max(1 + max(int(indexes.max()) for indexes in node_map) for node_map in node_maps)
+    i_curve = np.zeros((len(node_maps), n_node), dtype=np.intp)
+    i_node = np.zeros((len(node_maps), n_node), dtype=np.intp)
+    valid = np.zeros((len(node_maps), n_node), dtype=bool)
+
+    for i_ring, node_map in enumerate(node_maps):
+        # Later curves overwrite the shared end nodes with the same values
+        for curve, indexes in enumerate(node_map):
+            i_curve[i_ring, indexes] = curve
+            i_node[i_ring, indexes] = np.arange(indexes.size)
+            valid[i_ring, indexes] = True
+
+    return i_curve, i_node, valid
+
+
+def gather_nodes(ws, field, index):
+    """gather_nodes -- Values of one field on the unique nodes of all the rings.
+
+    Arguments:
+        ws    (Workspace) -- Archived nodal values of the whole problem.
+        field (str)       -- Name of the field, e.g. "GV_TX".
+        index (tuple)     -- Location of the unique nodes, see unique_node_index().
+    Return:
+        values (ndarray) -- Nodal values, zero on the padding nodes,
+                            (n_ring, n_time, n_node).
+    """
+    i_curve, i_node, valid = index
+    i_ring = np.arange(ws.n_ring)[:, None]
+
+    # (n_ring, n_node, n_time), advanced indexes first
+    values = ws.data[ws.fields.index(field)][i_ring, i_curve, :, i_node]
+
+    return np.where(valid[:, None, :], values.transpose(0, 2, 1), 0.0)
+
+
+def compute_energies(ws, layout):
+    """compute_energies -- Energies of all the rings, at all the frames.
+
+    The works are integrated by the trapezoidal rule, over the displacement
+    increments if RE was archived, else over time from the nodal speeds.
+
+    Arguments:
+        ws     (Workspace) -- Archived nodal values of the whole problem, with
+                              at least the GV, GF1 and GF2 fields.
+        layout (dict)      -- Ring layout of the simulation.
+    Return:
+        energies (dict) -- Energies, as (n_ring, n_time) arrays, under the
+                           keys "kinetic", "ext_work", "int_work" and
+                           "balance", and the ring masses, as "mass". The
+                           balance is approximate with more than one
+                           element through the thickness.
+    """
+    if layout is None:
+        raise ValueError("The energies need the ring layout, written by the template in layout.json.")
+
+    masses = lumped_masses(layout, ws.n_nodes)
+    index = unique_node_index(ws.n_nodes)
+    n_ring = ws.n_ring
+
+    def gather(field):
+        return np.stack([gather_nodes(ws, field + "_TX", index), gather_nodes(ws, field + "_TY", index)])
+
+    # (2, n_ring, n_time, n_node), along x and y
+    speed, fext, fint = gather("GV"), gather("GF1"), gather("GF2")
+
+    kinetic = 0.5 * np.einsum("rn,crtn->rt", masses, speed**2)
+
+    if "RE_TX" in ws.fields:
+        step = np.diff(gather("RE"), axis=2)
+    else:
+        step = 0.5 * (speed[:, :, 1:] + speed[:, :, :-1]) * np.diff(ws.t_sample)[:, None]
+
+    def work(force):
+        increments = np.einsum("crtn,crtn->rt", 0.5 * (force[:, :, 1:] + force[:, :, :-1]), step)
+        return np.concatenate((np.zeros((n_ring, 1)), np.cumsum(increments, axis=1)), axis=1)
+
+    ext_work, int_work = work(fext), work(fint)
+
+    return {
+        "mass": masses.sum(axis=1),
+        "kinetic": kinetic,
+        "ext_work": ext_work,
+        "int_work": int_work,
+        "balance": kinetic - kinetic[:, :1] - ext_work + int_work,
+    }
+
+
+def batch_energies(sim_dirs, max_workers=None):
+    """batch_energies -- Energies of many simulations, loaded concurrently.
+
+    Arguments:
+        sim_dirs    (list) -- Paths of the simulation results.
+        max_workers (int)  -- Number of loading threads, defaults to the
+                              ThreadPoolExecutor default.
+    Return:
+        energies (list) -- Energies of each simulation, see compute_energies(),
+                           with the time sample under "t_sample".
+    """
+    def energies(sim_dir):
+        ws = open_workspace(sim_dir)
+        return {"t_sample": ws.t_sample, **compute_energies(ws, open_layout(sim_dir))}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(energies, sim_dirs))
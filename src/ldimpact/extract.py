@@ -0,0 +1,185 @@
+"""extract -- Extract the whole Metafor simulation data.
+
+Python counterpart of src/pprocess/extract_nodal_values.m.
+
+The nodal values of each (ring, curve) pair are stored as NumPy arrays of
+shape (n_time, n_nodes), where each row is one archived time of tSample
+and each column is one node of the curve, sorted by curvilinear abscissa.
+Rings and curves are indexed from zero in the returned lists, whereas the
+archived file names keep the one-based Metafor labels.
+
+The arrays are views on the contiguous tensor of loader.load_workspace(),
+so that the whole workspace is parsed in a single pass. Unless disabled by
+the "cache" execution parameter, this tensor is memory-mapped from the
+binary cache of the workspace, see cache.load_workspace_cached(). Packed
+workspaces, see archive.pack_workspace(), are read transparently.
+"""
+
+import os
+
+from .archive import Archive, archive_path, is_packed, read_archive
+from .cache import load_workspace_cached
+from .loader import load_workspace, read_layout
+
+
+# Archived fields required by each group of nodal values
+GROUP_FIELDS = {
+    "geom":   ("AB_TX", "AB_TY", "RE_TX", "RE_TY"),
+    "nspeed": ("GV_TX", "GV_TY"),
+    "nfext":  ("GF1_TX", "GF1_TY"),
+    "nfint":  ("GF2_TX", "GF2_TY"),
+}
+
+
+def available_groups(ws):
+    """available_groups -- Groups of nodal values whose fields were all archived.
+
+    Argument:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    Return:
+        groups (set) -- Names of the available groups, among GROUP_FIELDS.
+    """
+    return {group for group, fields in GROUP_FIELDS.items() if set(fields) <= set(ws.fields)}
+
+
+def extract_nodal_values(run_arg):
+    """extract_nodal_values -- Extract the whole Metafor simulation data.
+
+    Argument:
+        run_arg (dict) -- Code execution parameters.
+    Return:
+        t_sample (ndarray) -- Time sample of the simulation recordings.
+        geom     (list)    -- Geometrical data.
+        nspeed   (list)    -- Nodal speeds.
+        nfext    (list)    -- Nodal external forces.
+        nfint    (list)    -- Nodal internal forces.
+        Each of these lists is None if its fields were not archived.
+    """
+    sim_dir = os.path.join(run_arg["res_dir_"], "workspace", run_arg["s_name"])
+
+    ws = open_workspace(sim_dir, run_arg["cache"])
+
+    return split_workspace(ws, run_arg["n_ring_"], run_arg["n_curve_"])
+
+
+def split_workspace(ws, n_ring=None, n_curve=None):
+    """split_workspace -- Split a workspace into the nested nodal values lists.
+
+    Arguments:
+        ws      (Workspace) -- Archived nodal values of the whole problem.
+        n_ring  (int)       -- Number of rings to extract, defaults to all.
+        n_curve (int)       -- Number of curves per ring, defaults to all.
+    Return:
+        t_sample (ndarray) -- Time sample of the simulation recordings.
+        geom     (list)    -- Geometrical data.
+        nspeed   (list)    -- Nodal speeds.
+        nfext    (list)    -- Nodal external forces.
+        nfint    (list)    -- Nodal internal forces.
+        Each of these lists is None if its fields were not archived,
+        see the archiving profiles of the template.
+    """
+    n_ring = ws.n_ring if n_ring is None else n_ring
+    n_curve = ws.n_curve if n_curve is None else n_curve
+
+    geom = [None] * n_ring
+    nspeed = [None] * n_ring
+    nfext = [None] * n_ring
+    nfint = [None] * n_ring
+
+    for i_ring in range(n_ring):
+        geom[i_ring], nspeed[i_ring], nfext[i_ring], nfint[i_ring] = \
+            _extract_ring(ws, i_ring, n_curve)
+
+    groups = available_groups(ws)
+    geom, nspeed, nfext, nfint = (
+        values if group in groups else None
+        for group, values in zip(GROUP_FIELDS, (geom, nspeed, nfext, nfint))
+    )
+
+    return ws.t_sample, geom, nspeed, nfext, nfint
+
+
+def open_workspace(sim_dir, cache=True):
+    """open_workspace -- Load a workspace, whatever the way it is stored.
+
+    The .ascii files of the workspace directory are read in priority,
+    and the consolidated archive is used once they are removed.
+
+    Arguments:
+        sim_dir (str)  -- Path of the simulation results.
+        cache   (bool) -- Go through the binary cache of the .ascii files.
+    Return:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    """
+    if is_packed(sim_dir):
+        return read_archive(archive_path(sim_dir))
+
+    return load_workspace_cached(sim_dir) if cache else load_workspace(sim_dir)
+
+
+def open_layout(sim_dir):
+    """open_layout -- Ring layout of a simulation, whatever the way it is stored.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        layout (dict) -- Ring layout written by the template, or None.
+    """
+    if is_packed(sim_dir):
+        with Archive(archive_path(sim_dir)) as archive:
+            return archive.layout
+
+    return read_layout(sim_dir)
+
+
+def _extract_ring(ws, i_ring, n_curve):
+    """_extract_ring -- Extract Metafor data of one ring.
+
+    Arguments:
+        ws      (Workspace) -- Archived nodal values of the whole problem.
+        i_ring  (int)       -- Zero-based index of the ring.
+        n_curve (int)       -- Number of curves composing the ring.
+    Return:
+        geom_ring   (list) -- Geometrical data of the ring.
+        nspeed_ring (list) -- Speed data of the ring.
+        nfext_ring  (list) -- External force data of the ring.
+        nfint_ring  (list) -- Internal force data of the ring.
+    """
+    geom_ring = [None] * n_curve
+    nspeed_ring = [None] * n_curve
+    nfext_ring = [None] * n_curve
+    nfint_ring = [None] * n_curve
+
+    for i_curve in range(n_curve):
+        geom_ring[i_curve], nspeed_ring[i_curve], nfext_ring[i_curve], nfint_ring[i_curve] = \
+            _extract_curve(ws, i_ring, i_curve)
+
+    return geom_ring, nspeed_ring, nfext_ring, nfint_ring
+
+
+def _extract_curve(ws, i_ring, i_curve):
+    """_extract_curve -- Extract Metafor data of one curve.
+
+    Arguments:
+        ws      (Workspace) -- Archived nodal values of the whole problem.
+        i_ring  (int)       -- Zero-based index of the ring.
+        i_curve (int)       -- Zero-based index of the curve.
+    Return:
+        geom_curve   (dict) -- Geometrical data of the curve.
+        nspeed_curve (dict) -- Speed data of the curve.
+        nfext_curve  (dict) -- External force data of the curve.
+        nfint_curve  (dict) -- Internal force data of the curve.
+    """
+    def load(field):
+        return ws.curve(field, i_ring, i_curve) if field in ws.fields else None
+
+    geom_curve = {
+        "tx": {"re": load("RE_TX"), "ab": load("AB_TX")},
+        "ty": {"re": load("RE_TY"), "ab": load("AB_TY")},
+    }
+    nspeed_curve = {"tx": load("GV_TX"),  "ty": load("GV_TY")}
+    nfext_curve  = {"tx": load("GF1_TX"), "ty": load("GF1_TY")}
+    nfint_curve  = {"tx": load("GF2_TX"), "ty": load("GF2_TY")}
+
+    return geom_curve, nspeed_curve, nfext_curve, nfint_curve
+
@@ -0,0 +1,103 @@
+"""framerate -- Event-triggered archiving schedule of a simulation.
+
+The template archives n_intermediate equally spaced states, so that the
+impacts and rebounds, which last a small fraction of the run, are sampled
+as coarsely as the free flight phases. Metafor only archives the states
+requested in advance through tsm.setNextTime(), so the events cannot be
+detected while the simulation runs.
+
+This module rather detects them in the archived frames of a previous run
+of the same problem, typically a coarse pilot run: a frame belongs to an
+event as soon as the contact force on a node of any curve, i.e. the norm
+of its GF1 nodal force, exceeds a threshold. The events, widened by a few
+frames, are archived `ratio` times more densely than the free flight, and
+the intervals are chosen so that the total number of archived states does
+not exceed the one of the pilot run. The resulting schedule is given to
+getMetafor() through p['archive_schedule'].
+"""
+
+import numpy as np
+
+from .extract import open_workspace
+
+
+def contact_force_peaks(ws):
+    """contact_force_peaks -- Largest nodal contact force, per frame.
+
+    Argument:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    Return:
+        peaks (ndarray) -- Largest norm of the GF1 nodal forces over all the
+                           nodes of all the curves, at each frame, (n_time,).
+    """
+    i_tx, i_ty = ws.fields.index("GF1_TX"), ws.fields.index("GF1_TY")
+
+    # (n_ring, n_curve, n_time, n_node), NaN on the padded nodes
+    norm = np.hypot(ws.data[i_tx], ws.data[i_ty])
+
+    return np.nanmax(norm.transpose(2, 0, 1, 3).reshape(ws.n_time, -1), axis=1)
+
+
+def frame_schedule(t_sample, active, n_frames, ratio=10, margin=2):
+    """frame_schedule -- Archiving intervals, dense on the active frames.
+
+    Arguments:
+        t_sample (ndarray) -- Time sample of the frames, (n_time,).
+        active   (ndarray) -- Whether each frame belongs to an event, (n_time,).
+        n_frames (int)     -- Number of states to archive over the run.
+        ratio    (float)   -- Archiving density of the events over the one of
+                              the free flight.
+        margin   (int)     -- Number of frames by which the events are widened,
+                              on both sides.
+    Return:
+        schedule (list) -- Phases, as (end_time, frame_interval) tuples.
+    """
+    active = np.asarray(active, dtype=bool)
+
+    # Widen the events, which may start and end between two frames
+    kernel = np.ones(2*margin + 1, dtype=bool)
+    active = np.convolve(active, kernel, mode="same") > 0
+
+    # Between two frames, dense if any of both is active
+    span_active = active[:-1] | active[1:]
+    span_time = np.diff(t_sample)
+
+    # Free flight interval such that the total number of frames is n_frames
+    t_dense = span_time[span_active].sum()
+    t_sparse = span_time[~span_active].sum()
+    sparse = (t_sparse + ratio*t_dense) / n_frames
+    dense = sparse / ratio
+
+    schedule = []
+    for i_span, is_active in enumerate(span_active):
+        interval = float(dense if is_active else sparse)
+        if schedule and schedule[-1][1] == interval:
+            schedule[-1] = (float(t_sample[i_span+1]), interval)
+        else:
+            schedule.append((float(t_sample[i_span+1]), interval))
+
+    return schedule
+
+
+def frame_schedule_from_workspace(sim_dir, threshold=None, n_frames=None, **kwargs):
+    """frame_schedule_from_workspace -- Archiving schedule from a previous run.
+
+    Arguments:
+        sim_dir   (str)   -- Path of the results of the previous run.
+        threshold (float) -- Contact force [N] beyond which a frame belongs to
+                             an event, defaults to 5% of the peak force.
+        n_frames  (int)   -- Number of states to archive, defaults to the
+                             number of frames of the previous run.
+        kwargs            -- Options of frame_schedule().
+    Return:
+        schedule (list) -- Phases, to be given as p['archive_schedule'].
+    """
+    ws = open_workspace(sim_dir)
+    peaks = contact_force_peaks(ws)
+
+    if threshold is None:
+        threshold = 0.05 * np.max(peaks)
+    if n_frames is None:
+        n_frames = ws.n_time - 1
+
+    return frame_schedule(ws.t_sample, peaks > threshold, n_frames, **kwargs)
@@ -0,0 +1,255 @@
+"""loader -- Single-pass bulk loader of a Metafor workspace directory.
+
+The archiving loop of src/template.py writes one .ascii file per
+(field, ring, curve) triplet, named {field}_curve{c}_ring{r}.ascii, plus the
+tSample.ascii time sample. Rather than opening these files one by one, the
+loader discovers them all from their names, parses them concurrently in a
+thread pool and gathers them into one contiguous float64 tensor indexed by
+(field, ring, curve, time, node).
+
+As the curves of a ring do not hold the same number of nodes, the node axis
+is sized after the largest curve and the trailing entries of the smaller
+curves are padded with NaN. Workspace.curve() returns the unpadded view.
+
+The curves of a ring share their end nodes, so that some nodes appear on
+two or three curves. Workspace.ring() gathers the values of the unique
+nodes of a ring, as located by ring_node_map().
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Nodal fields archived by src/template.py, in the order of dbnodal_fields
+FIELDS = (
+    "AB_TX", "AB_TY",
+    "RE_TX", "RE_TY",
+    "GV_TX", "GV_TY",
+    "GF1_TX", "GF1_TY",
+    "GF2_TX", "GF2_TY",
+)
+
+# End points of the curves of a ring, in the order of their nodes, as
+# defined in Ring.build_geometry() of src/template.py: the inner arcs 1-2
+# and the outer arcs 3-4 share their ends, joined by the cutting lines 5-6.
+CURVE_ENDS = ((1, 3), (3, 1), (5, 7), (7, 5), (5, 1), (3, 7))
+
+# Ring layout written by src/template.py, next to the .ascii files
+LAYOUT = "layout.json"
+
+_CURVE_FILE = re.compile(r"^(?P<field>\w+?)_curve(?P<curve>\d+)_ring(?P<ring>\d+)\.ascii$")
+
+
+class Workspace():
+    """Workspace -- All the nodal values archived in one workspace directory.
+
+    Attributes:
+        t_sample (ndarray) -- Time sample of the simulation recordings, (n_time,).
+        fields   (tuple)   -- Names of the archived fields, along the first axis.
+        n_nodes  (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+        data     (ndarray) -- Nodal values, (n_field, n_ring, n_curve, n_time, n_node).
+    """
+
+    def __init__(self, t_sample, fields, n_nodes, data):
+        self.t_sample = t_sample
+        self.fields = tuple(fields)
+        self.n_nodes = n_nodes
+        self.data = data
+
+    @property
+    def n_ring(self):
+        return self.data.shape[1]
+
+    @property
+    def n_curve(self):
+        return self.data.shape[2]
+
+    @property
+    def n_time(self):
+        return self.data.shape[3]
+
+    @property
+    def node_map(self):
+        """node_map -- Indexes of the curve nodes among the unique nodes, per ring."""
+        return [ring_node_map(n_nodes_ring) for n_nodes_ring in self.n_nodes]
+
+    def ring(self, field, i_ring):
+        """ring -- Values of one field, for the unique nodes of one ring.
+
+        Arguments:
+            field  (str) -- Archived nodal field, e.g. "GV_TX".
+            i_ring (int) -- Zero-based index of the ring.
+        Return:
+            values (ndarray) -- Nodal values of the ring, (n_time, n_unique).
+        """
+        return ring_values(
+            [self.curve(field, i_ring, i_curve) for i_curve in range(self.n_curve)],
+            ring_node_map(self.n_nodes[i_ring]),
+        )
+
+    def curve(self, field, i_ring, i_curve):
+        """curve -- View on the values of one field, for one curve.
+
+        Arguments:
+            field   (str) -- Archived nodal field, e.g. "GV_TX".
+            i_ring  (int) -- Zero-based index of the ring.
+            i_curve (int) -- Zero-based index of the curve.
+        Return:
+            values (ndarray) -- Nodal values of the curve, (n_time, n_nodes).
+        """
+        i_field = self.fields.index(field)
+        return self.data[i_field, i_ring, i_curve, :, :self.n_nodes[i_ring, i_curve]]
+
+
+def discover(sim_dir):
+    """discover -- Find the per-curve .ascii files of a workspace directory.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        files (dict) -- Map (field, i_ring, i_curve) to the file path,
+                        with zero-based ring and curve indexes.
+    """
+    files = {}
+    for entry in os.scandir(sim_dir):
+        match = _CURVE_FILE.match(entry.name)
+        if match:
+            key = (match["field"], int(match["ring"])-1, int(match["curve"])-1)
+            files[key] = entry.path
+
+    return files
+
+
+def parse_ascii(path):
+    """parse_ascii -- Parse one .ascii file written by the fac values manager.
+
+    Faster than a generic text loader, as the file is read in one call and
+    split on whitespace before a single conversion to float64. The number of
+    columns is given by the first row, and an incomplete trailing row, as
+    left by a running simulation, is discarded.
+
+    Argument:
+        path (str) -- Path of the .ascii file.
+    Return:
+        values (ndarray) -- Archived values, of shape (n_time, n_values).
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+
+    n_col = len(content.split(b"\n", 1)[0].split())
+    if n_col == 0:
+        return np.empty((0, 0))
+
+    values = np.array(content.split(), dtype=np.float64)
+    n_row = values.size // n_col
+
+    return values[:n_row*n_col].reshape(n_row, n_col)
+
+
+def load_workspace(sim_dir, max_workers=None):
+    """load_workspace -- Load all the nodal values of a workspace directory.
+
+    Arguments:
+        sim_dir     (str) -- Path of the simulation results.
+        max_workers (int) -- Number of parsing threads, see ThreadPoolExecutor.
+    Return:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    """
+    files = discover(sim_dir)
+    if not files:
+        raise FileNotFoundError(f"No curve .ascii file found in {sim_dir}")
+
+    keys = sorted(files)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        t_sample = executor.submit(parse_ascii, os.path.join(sim_dir, "tSample.ascii"))
+        parsed = dict(zip(keys, executor.map(parse_ascii, (files[key] for key in keys))))
+        t_sample = t_sample.result().ravel()
+
+    # Known fields come first, in archiving order
+    found = {field for field, _, _ in keys}
+    fields = [field for field in FIELDS if field in found] + sorted(found - set(FIELDS))
+    n_ring = 1 + max(i_ring for _, i_ring, _ in keys)
+    n_curve = 1 + max(i_curve for _, _, i_curve in keys)
+
+    # Files may not be flushed evenly while Metafor runs:
+    # only keep the frames that are available everywhere.
+    n_time = min(len(t_sample), *(values.shape[0] for values in parsed.values()))
+    n_node = max(values.shape[1] for values in parsed.values())
+
+    n_nodes = np.zeros((n_ring, n_curve), dtype=np.intp)
+    data = np.full((len(fields), n_ring, n_curve, n_time, n_node), np.nan)
+    for (field, i_ring, i_curve), values in parsed.items():
+        n_nodes[i_ring, i_curve] = values.shape[1]
+        data[fields.index(field), i_ring, i_curve, :, :values.shape[1]] = values[:n_time]
+
+    return Workspace(t_sample[:n_time], fields, n_nodes, data)
+
+
+def ring_node_map(n_nodes_ring):
+    """ring_node_map -- Indexes of the curve nodes among the unique nodes of a ring.
+
+    The unique nodes are numbered curve after curve, each end node being
+    numbered by the first curve that holds it, see CURVE_ENDS.
+
+    Argument:
+        n_nodes_ring (array) -- Number of nodes of each curve of the ring.
+    Return:
+        node_map (list) -- Index array of each curve, (n_nodes,).
+    """
+    numbered = {}
+    n_unique = 0
+
+    def end_node(point):
+        nonlocal n_unique
+        if point not in numbered:
+            numbered[point] = n_unique
+            n_unique += 1
+        return numbered[point]
+
+    node_map = []
+    for (first, last), n_nodes in zip(CURVE_ENDS, n_nodes_ring):
+        n_nodes = int(n_nodes)
+        start = end_node(first)
+        inner = np.arange(n_unique, n_unique + max(n_nodes-2, 0))
+        n_unique += inner.size
+        stop = end_node(last)
+        node_map.append(np.concatenate(([start], inner, [stop])).astype(np.intp)[:n_nodes])
+
+    return node_map
+
+
+def ring_values(curve_values, node_map):
+    """ring_values -- Gather the values of the curves of a ring on its unique nodes.
+
+    Arguments:
+        curve_values (list) -- Values of each curve, (n_time, n_nodes).
+        node_map     (list) -- Index array of each curve, see ring_node_map().
+    Return:
+        values (ndarray) -- Values of the unique nodes, (n_time, n_unique).
+    """
+    n_unique = 1 + max(int(indexes.max()) for indexes in node_map if indexes.size)
+    values = np.full((curve_values[0].shape[0], n_unique), np.nan)
+    for indexes, curve in zip(node_map, curve_values):
+        values[:, indexes] = curve
+
+    return values
+
+
+def read_layout(sim_dir):
+    """read_layout -- Ring layout of a simulation, as written by the template.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        layout (dict) -- Number of rings and curves, ring parameters and
+                         contacts of the simulation, or None if the
+                         simulation predates the layout file.
+    """
+    try:
+        with open(os.path.join(sim_dir, LAYOUT)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
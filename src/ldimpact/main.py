@@ -0,0 +1,139 @@
+"""main -- Trigger all the post-processing code.
+
+Python counterpart of src/pprocess/main.m.
+
+The default values used to run this function
+are stored in ldimpact.util.load_defaults().
+
+The user can override these parameters by completing
+ldimpact.util.set_running_arguments(), or by passing them
+directly to main().
+"""
+
+import os
+
+import numpy as np
+
+from .compute import (
+    compute_displacements,
+    compute_external_forces,
+    compute_kinetic,
+    compute_mean_motion,
+    compute_perimeters,
+)
+from .extract import extract_nodal_values
+from .util import load_defaults, set_running_arguments
+
+
+def main(run_arg=None):
+    """main -- Trigger all the post-processing code.
+
+    Argument:
+        run_arg (dict) -- Code execution parameters overriding the defaults.
+                          If None, those of set_running_arguments() are used.
+    Return:
+        out (dict) -- All the generated post-processing data.
+    """
+    # 1. SET THE PROGRAM INITIAL STATE {{{1
+
+    # Find the root directory of the project
+    root_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+    # Define the resource directory (saved simulation results)
+    res_directory = os.path.join(root_directory, "res")
+    os.makedirs(res_directory, exist_ok=True)
+
+    # Define the output directory (saved post-processing results)
+    out_directory = os.path.join(root_directory, "out")
+    os.makedirs(out_directory, exist_ok=True)
+
+    # 2. SET THE CODE EXECUTION PARAMETERS {{{1
+
+    # Overwrite the defaults with user input
+    run_arg = {**load_defaults(), **(set_running_arguments() if run_arg is None else run_arg)}
+
+    # Save the project structure in the running arguments
+    run_arg["root_dir_"] = root_directory
+    run_arg["res_dir_"] = res_directory
+    run_arg["out_dir_"] = out_directory
+
+    # 3. EXECUTE THE POST-PROCESSING CODE {{{1
+
+    t_sample, geom, nspeed, nfext, nfint = extract_nodal_values(run_arg)
+
+    out = {"run_arg": run_arg, **post_process(t_sample, geom, nspeed, nfext, nfint)}
+
+    # 4. SAVE THE GENERATED DATA {{{1
+
+    if "s" in run_arg["outs"]:
+        available = {key: value for key, value in out.items() if value is not None}
+        np.savez(os.path.join(run_arg["out_dir_"], run_arg["s_name"] + ".npz"), **flatten(available))
+
+    return out
+
+
+def post_process(t_sample, geom, nspeed, nfext, nfint):
+    """post_process -- Compute all the post-processed quantities.
+
+    Only the quantities whose fields were archived are computed, see the
+    archiving profiles of the template. The others are None.
+
+    Arguments:
+        t_sample (ndarray) -- Time sample of the simulation recordings.
+        geom     (list)    -- Geometrical data.
+        nspeed   (list)    -- Nodal speeds.
+        nfext    (list)    -- Nodal external forces.
+        nfint    (list)    -- Nodal internal forces.
+    Return:
+        out (dict) -- Nodal values and post-processed quantities.
+    """
+    displ = perim = fext = mspeed = mdispl = node_count = kin = None
+
+    if geom is not None:
+        displ = compute_displacements(geom)
+        perim = compute_perimeters(displ)
+
+    if nfext is not None:
+        fext = compute_external_forces(nfext)
+
+    if nspeed is not None and displ is not None:
+        mspeed, mdispl = compute_mean_motion(nspeed, displ)
+
+    if nspeed is not None:
+        node_count, kin = compute_kinetic(nspeed)
+
+    return {
+        "t_sample": t_sample, "geom": geom,
+        "nspeed": nspeed, "nfext": nfext, "nfint": nfint,
+        "displ": displ, "perim": perim, "fext": fext,
+        "mspeed": mspeed, "mdispl": mdispl, "node_count": node_count, "kin": kin,
+    }
+
+
+def flatten(data, prefix=""):
+    """flatten -- Flatten nested post-processing data into named arrays.
+
+    Lists are indexed with one-based ring and curve labels, so that
+    the generated keys read like the archived file names,
+    e.g. "displ/ring1/curve3/tx".
+
+    Arguments:
+        data   (any) -- Nested dicts and lists of post-processing data.
+        prefix (str) -- Key of data in the flattened output.
+    Return:
+        flat (dict) -- Flattened data, mapping keys to NumPy arrays.
+    """
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        # Ring lists hold curve lists, curve lists hold dicts of arrays
+        label = "curve" if prefix.count("/ring") else "ring"
+        items = ((f"{label}{idx+1}", value) for idx, value in enumerate(data))
+    else:
+        return {prefix: np.asarray(data)}
+
+    flat = {}
+    for key, value in items:
+        flat.update(flatten(value, f"{prefix}/{key}" if prefix else key))
+
+    return flat
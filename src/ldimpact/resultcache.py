@@ -0,0 +1,164 @@
+"""resultcache -- Content-addressed cache of simulation results.
+
+Each simulation case is identified by a stable key, the SHA-256 digest of
+its resolved parameters, i.e. the full dict returned by params(p) of the
+description file, and of the source of the description file itself. Two
+cases with the same key produce the same results, so a sweep that is run
+again after adding a point only computes the new cases.
+
+The cache is a directory holding one entry per key:
+    <root>/<key>/params.json   -- resolved parameters of the case
+    <root>/<key>/results.json  -- scalar results of the case
+    <root>/<key>/...           -- workspace of the case (.ascii, .cache/)
+The entries are evicted in least recently used order, as soon as the total
+size of the cache exceeds its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+PARAMS = "params.json"
+RESULTS = "results.json"
+
+# Parameters that do not change the simulation results
+VOLATILE_PARAMS = ("n_tasks", "use_tbb", "debug", "profile")
+
+
+def case_key(p, source=""):
+    """case_key -- Stable key of a simulation case.
+
+    Arguments:
+        p      (dict) -- Resolved parameters of the case.
+        source (str)  -- Source code of the description file.
+    Return:
+        key (str) -- Hexadecimal SHA-256 digest.
+    """
+    p = {key: value for key, value in p.items() if key not in VOLATILE_PARAMS}
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(p, sort_keys=True, default=repr).encode())
+    digest.update(source.encode())
+
+    return digest.hexdigest()
+
+
+class ResultCache():
+    """ResultCache -- On-disk cache of simulation results, with LRU eviction.
+
+    Attributes:
+        root   (str) -- Directory of the cache.
+        budget (int) -- Maximum total size of the cache, in bytes.
+    """
+
+    def __init__(self, root, budget=50 * 2**30):
+        self.root = os.path.abspath(root)
+        self.budget = budget
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key):
+        """path -- Directory of the cache entry of a key."""
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """get -- Scalar results of a cached case, marked as recently used.
+
+        Argument:
+            key (str) -- Key of the case.
+        Return:
+            results (dict) -- Scalar results, or None on a cache miss.
+        """
+        try:
+            with open(os.path.join(self.path(key), RESULTS)) as file:
+                results = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        os.utime(os.path.join(self.path(key), PARAMS))
+
+        return results
+
+    def reserve(self, key, p):
+        """reserve -- Create the entry of a key, where the case will be run.
+
+        Arguments:
+            key (str)  -- Key of the case.
+            p   (dict) -- Resolved parameters of the case.
+        Return:
+            entry_dir (str) -- Directory of the entry.
+        """
+        entry_dir = self.path(key)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(entry_dir)
+        with open(os.path.join(entry_dir, PARAMS), "w") as file:
+            json.dump(p, file, default=repr)
+
+        return entry_dir
+
+    def put(self, key, results):
+        """put -- Complete the entry of a key with the scalar results of its case.
+
+        Written last, the results mark the entry as valid.
+
+        Arguments:
+            key     (str)  -- Key of the case.
+            results (dict) -- Scalar results of the case.
+        """
+        path = os.path.join(self.path(key), RESULTS)
+        with open(path + ".tmp", "w") as file:
+            json.dump(results, file)
+        os.replace(path + ".tmp", path)
+        os.utime(os.path.join(self.path(key), PARAMS))
+
+    def discard(self, key):
+        """discard -- Remove the entry of a key."""
+        shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def evict(self, keep=()):
+        """evict -- Remove the least recently used entries, down to the disk budget.
+
+        Argument:
+            keep (iterable) -- Keys that must not be evicted.
+        Return:
+            evicted (list) -- Keys of the removed entries.
+        """
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                entries.append((_last_used(entry.path), _disk_usage(entry.path), entry.name))
+
+        total = sum(size for _, size, _ in entries)
+        keep = set(keep)
+
+        evicted = []
+        for _, size, key in sorted(entries):
+            if total <= self.budget:
+                break
+            if key in keep:
+                continue
+            self.discard(key)
+            total -= size
+            evicted.append(key)
+
+        return evicted
+
+
+def _last_used(entry_dir):
+    try:
+        return os.stat(os.path.join(entry_dir, PARAMS)).st_mtime
+    except OSError:
+        # Incomplete entry, first to go
+        return 0.0
+
+
+def _disk_usage(path):
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.stat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+
+    return size
@@ -0,0 +1,189 @@
+"""rowindex -- Byte offsets of the rows of the .ascii files of a workspace.
+
+Each .ascii file holds one text row per archived time, so that reading the
+frame of a given time requires scanning all the rows before it. The row
+index records the byte offset at which each row of each file starts, so
+that any window of frames is read by one seek and one read, whatever the
+length of the run.
+
+The index is persisted in the .cache/ directory of the workspace, see
+cache.py, as rows.npz, holding for every file the offsets of its complete
+rows followed by the offset of the end of the last one, and the stamp of
+the file: its modification time and size, as in the manifest of cache.py,
+and the CRC-32 of its last indexed row. A file whose modification time and
+size did not change is not read again. As the fac values manager only
+appends rows, a file that grew and still holds the last indexed row is
+only scanned from the indexed end. Any other change, e.g. a rewrite by a
+new run, indexes the file again.
+
+Usage:
+    from ldimpact.rowindex import RowIndex
+    index = RowIndex("res/workspace/<s_name>").update()
+    values = index.read("GV_TX_curve1_ring1.ascii", 100, 110)
+"""
+
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .cache import CACHE_DIR, replace_file
+from .loader import discover
+
+INDEX = "rows.npz"
+
+# Suffix of the index entries holding the stamps of the files
+_STAMP = ".stamp"
+
+# Size of the blocks in which the appended bytes are scanned
+_BLOCK = 2**26
+
+
+class RowIndex():
+    """RowIndex -- Persisted byte offsets of the rows of a workspace directory.
+
+    Attributes:
+        sim_dir     (str)  -- Path of the simulation results.
+        offsets     (dict) -- Map each file name to the start offsets of its
+                              complete rows, followed by the end offset of
+                              the last one, (n_rows+1,).
+        stamps      (dict) -- Map each file name to its stamp at the last
+                              indexing, see index_rows().
+        max_workers (int)  -- Number of scanning threads of update().
+    """
+
+    def __init__(self, sim_dir, max_workers=None):
+        self.sim_dir = sim_dir
+        self.max_workers = max_workers
+        self.offsets = {}
+        self.stamps = {}
+
+        try:
+            with np.load(self.path) as index:
+                for name in index.files:
+                    if name.endswith(_STAMP):
+                        self.stamps[name[:-len(_STAMP)]] = index[name].tolist()
+                    else:
+                        self.offsets[name] = index[name]
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def path(self):
+        """path -- Path of the persisted index."""
+        return os.path.join(self.sim_dir, CACHE_DIR, INDEX)
+
+    def update(self):
+        """update -- Index the files that changed since the previous update.
+
+        Return:
+            self (RowIndex) -- The updated index, persisted if it changed.
+        """
+        names = [os.path.basename(path) for path in discover(self.sim_dir).values()] + ["tSample.ascii"]
+
+        def scan(name):
+            path = os.path.join(self.sim_dir, name)
+            return name, index_rows(path, self.offsets.get(name), self.stamps.get(name))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            scanned = dict(executor.map(scan, names))
+
+        stamps = {name: stamp for name, (_, stamp) in scanned.items()}
+        changed = stamps != self.stamps or set(scanned) != set(self.offsets)
+        self.offsets = {name: offsets for name, (offsets, _) in scanned.items()}
+        self.stamps = stamps
+        if changed:
+            try:
+                self.save()
+            except OSError:
+                # Read-only workspace, the index is only kept in memory
+                pass
+
+        return self
+
+    def save(self):
+        """save -- Persist the index, atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with replace_file(self.path, "wb") as file:
+            np.savez(
+                file, **self.offsets,
+                **{name + _STAMP: np.array(stamp, dtype=np.int64) for name, stamp in self.stamps.items()},
+            )
+
+    def n_rows(self, name):
+        """n_rows -- Number of indexed rows of a file."""
+        return self.offsets[name].size - 1
+
+    def read(self, name, start=0, stop=None):
+        """read -- Parse a window of rows of one file, by one seek and one read.
+
+        Arguments:
+            name  (str) -- Name of the .ascii file, e.g. "GV_TX_curve1_ring1.ascii".
+            start (int) -- First row of the window.
+            stop  (int) -- Row following the window, defaults to the last
+                           indexed one.
+        Return:
+            values (ndarray) -- Archived values of the rows, (n_rows, n_values).
+        """
+        offsets = self.offsets[name]
+        start, stop, _ = slice(start, stop).indices(offsets.size - 1)
+        stop = max(start, stop)
+
+        with open(os.path.join(self.sim_dir, name), "rb") as file:
+            if stop == start:
+                return np.empty((0, len(file.readline().split())))
+            file.seek(offsets[start])
+            content = file.read(offsets[stop] - offsets[start])
+
+        return np.array(content.split(), dtype=np.float64).reshape(stop - start, -1)
+
+
+def index_rows(path, offsets=None, stamp=None):
+    """index_rows -- Byte offsets of the complete rows of one file.
+
+    Arguments:
+        path    (str)     -- Path of the .ascii file.
+        offsets (ndarray) -- Offsets of a previous indexing of the file.
+        stamp   (list)    -- Stamp of the file at the previous indexing. The
+                             offsets are reused if the file did not change
+                             since, and only extended if it was appended to.
+    Return:
+        offsets (ndarray) -- Start offsets of the complete rows, followed by
+                             the end offset of the last one, (n_rows+1,).
+        stamp   (list)    -- Modification time [ns], size [bytes] and CRC-32
+                             of the last indexed row of the file.
+    """
+    stat = os.stat(path)
+    if offsets is not None and stamp is not None and stamp[:2] == [stat.st_mtime_ns, stat.st_size]:
+        return offsets, stamp
+
+    with open(path, "rb") as file:
+        # Only a file that grew and still holds the last indexed row was appended to
+        if offsets is None or stamp is None or stat.st_size <= stamp[1] or _row_crc(file, offsets) != stamp[2]:
+            offsets = np.zeros(1, dtype=np.int64)
+
+        ends = []
+        position = int(offsets[-1])
+        file.seek(position)
+        while True:
+            block = file.read(_BLOCK)
+            if not block:
+                break
+            ends.append(position + 1 + np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord("\n")))
+            position += len(block)
+
+        offsets = np.concatenate([offsets] + ends).astype(np.int64)
+        stamp = [stat.st_mtime_ns, stat.st_size, _row_crc(file, offsets)]
+
+    return offsets, stamp
+
+
+def _row_crc(file, offsets):
+    """_row_crc -- CRC-32 of the last indexed row of a file, 0 if there is none."""
+    if offsets.size < 2:
+        return 0
+
+    file.seek(offsets[-2])
+
+    return zlib.crc32(file.read(int(offsets[-1] - offsets[-2])))
@@ -0,0 +1,160 @@
+"""scene -- Generator of N-ring scenes for the template.
+
+The template builds every ring listed in p['rings'], and every contact
+listed in p['contacts']. This module generates both lists from array-like
+specifications of the rings, so that packed assemblies of tens to hundreds
+of rings can be simulated from the template alone:
+    p = scene_params(centers, inner_radii, outer_radii, impactors=[1], fixed=[N])
+    metafor = getMetafor(p)
+
+The contacts are deduced from the geometry: a ring lying inside the hole of
+another ring gets an 'outer_inner' contact with it, and two rings that are
+not nested get an 'outer_outer' contact. The pairs of curves that cannot
+meet are further pruned by the template, see its section 4.
+"""
+
+import math
+
+import numpy as np
+
+# Reference ring: geometry, mesh and material of ring 1 of the template
+REFERENCE_RING = dict(
+    alpha=180, theta=0,
+    nelem_radial=1, nelem_contour_coarse=4, nelem_contour_fine=12,
+    material='elastic', mass_density=1e-7, elastic_modulus=10E3, poisson_ratio=0.125,
+    ih_sigel=None,
+)
+
+
+def scene_params(centers, inner_radii, outer_radii, alphas=180, thetas=0,
+                 materials=None, impactors=(1,), fixed=None, init_speed=(30E3, -30E3)):
+    """scene_params -- Template parameters of a scene of N rings.
+
+    Arguments:
+        centers     (array) -- Centers of the rings, (N, 2).
+        inner_radii (array) -- Inner radii of the rings, (N,) or scalar.
+        outer_radii (array) -- Outer radii of the rings, (N,) or scalar.
+        alphas      (array) -- Aperture angles of the rings [deg], (N,) or scalar.
+        thetas      (array) -- Rotation angles of the rings [deg], (N,) or scalar.
+        materials   (list)  -- Material dicts of the rings, merged into REFERENCE_RING,
+                               e.g. {'mass_density': 1e-6}. One dict or N dicts.
+        impactors   (list)  -- Numbers of the rings given the initial speed.
+        fixed       (list)  -- Numbers of the rings clamped on their outer side,
+                               defaults to the largest ring.
+        init_speed  (tuple) -- Initial speed of the impactors.
+    Return:
+        p (dict) -- Parameters to give to getMetafor(p).
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    n_ring = len(centers)
+    inner_radii, outer_radii, alphas, thetas = (
+        np.broadcast_to(np.asarray(values, dtype=float), (n_ring,))
+        for values in (inner_radii, outer_radii, alphas, thetas)
+    )
+    if materials is None or isinstance(materials, dict):
+        materials = [materials or {}] * n_ring
+    if fixed is None:
+        fixed = [int(np.argmax(outer_radii)) + 1]
+
+    rings = []
+    for i_ring in range(n_ring):
+        ring = dict(REFERENCE_RING)
+        ring.update(
+            center=tuple(centers[i_ring]),
+            inner_radius=float(inner_radii[i_ring]),
+            outer_radius=float(outer_radii[i_ring]),
+            alpha=float(alphas[i_ring]),
+            theta=float(thetas[i_ring]),
+        )
+        ring.update(mesh_density(ring['inner_radius']))
+        ring.update(materials[i_ring])
+        rings.append(ring)
+
+    return {
+        'rings': rings,
+        'contacts': scene_contacts(centers, inner_radii, outer_radii),
+        'impactor_ring': list(impactors),
+        'fixed_ring': list(fixed),
+        'init_speed': tuple(init_speed),
+    }
+
+
+def scene_contacts(centers, inner_radii, outer_radii):
+    """scene_contacts -- Contacts between the rings of a scene.
+
+    Arguments:
+        centers     (ndarray) -- Centers of the rings, (N, 2).
+        inner_radii (ndarray) -- Inner radii of the rings, (N,).
+        outer_radii (ndarray) -- Outer radii of the rings, (N,).
+    Return:
+        contacts (list) -- Contacts, as in p['contacts'] of the template.
+    """
+    dist = np.hypot(*(centers[:, None, :] - centers[None, :, :]).transpose(2, 0, 1))
+
+    # nested[i, j]: ring j lies inside the hole of ring i
+    nested = dist + outer_radii[None, :] <= inner_radii[:, None]
+
+    contacts = []
+    for i, j in zip(*np.triu_indices(len(centers), k=1)):
+        if nested[i, j]:
+            contacts.append(('outer_inner', int(i)+1, int(j)+1))
+        elif nested[j, i]:
+            contacts.append(('outer_inner', int(j)+1, int(i)+1))
+        else:
+            contacts.append(('outer_outer', int(i)+1, int(j)+1))
+
+    return contacts
+
+
+def mesh_density(inner_radius, reference_radius=8):
+    """mesh_density -- Numbers of contour elements of a ring, for a uniform mesh size.
+
+    The numbers of elements of the reference ring 1 of the template are
+    scaled in proportion of the ring radius.
+
+    Arguments:
+        inner_radius     (float) -- Inner radius of the ring.
+        reference_radius (float) -- Inner radius of the reference ring.
+    Return:
+        nelem (dict) -- Numbers of elements, as in the ring parameters.
+    """
+    scale = inner_radius / reference_radius
+    return {
+        'nelem_contour_coarse': max(1, math.ceil(REFERENCE_RING['nelem_contour_coarse'] * scale)),
+        'nelem_contour_fine': max(1, math.ceil(REFERENCE_RING['nelem_contour_fine'] * scale)),
+    }
+
+
+def packed_scene(n_ring, inner_radius=8, outer_radius=10, gap=2, thickness=4, **kwargs):
+    """packed_scene -- N-1 identical rings on a square lattice, inside a container ring.
+
+    The first ring is the impactor, the last one is the clamped container.
+
+    Arguments:
+        n_ring       (int)   -- Total number of rings, container included.
+        inner_radius (float) -- Inner radius of the packed rings.
+        outer_radius (float) -- Outer radius of the packed rings.
+        gap          (float) -- Gap between two neighbouring packed rings.
+        thickness    (float) -- Thickness of the container ring.
+        kwargs               -- Other arguments of scene_params().
+    Return:
+        p (dict) -- Parameters to give to getMetafor(p).
+    """
+    n_packed = n_ring - 1
+    n_side = math.ceil(math.sqrt(n_packed))
+    pitch = 2*outer_radius + gap
+
+    # Lattice centered on the origin
+    grid = (np.arange(n_side) - (n_side-1)/2) * pitch
+    xs, ys = np.meshgrid(grid, grid)
+    centers = np.column_stack((xs.ravel(), ys.ravel()))[:n_packed]
+
+    container_ri = np.hypot(*centers.T).max() + outer_radius + gap
+    centers = np.vstack((centers, [0, 0]))
+    inner_radii = np.append(np.full(n_packed, inner_radius), container_ri)
+    outer_radii = np.append(np.full(n_packed, outer_radius), container_ri + thickness)
+
+    kwargs.setdefault('fixed', [n_ring])
+    kwargs.setdefault('alphas', np.append(np.full(n_packed, 180), 90))
+
+    return scene_params(centers, inner_radii, outer_radii, **kwargs)
@@ -0,0 +1,256 @@
+"""stream -- Live post-processing of a running simulation.
+
+The fac values manager of Metafor appends one row to each .ascii file of
+the workspace per archived state. The StreamReader follows these files:
+each poll only reads the bytes appended since the previous one, and
+returns the new frames once every file holds them, the trailing row being
+possibly incomplete while Metafor writes it. As Metafor may create the
+files after the monitor started, they are discovered again at each poll
+until all the files listed by layout.json exist, or, for the runs that
+predate the layout file, until the first frames are returned.
+
+The LiveMonitor post-processes these new frames only, as every quantity
+of main.post_process() is computed frame per frame, and appends them to
+the quantities of the previous frames, held in buffers whose capacity
+doubles when full, so that following a long run stays linear in its
+length. A bad run can thus be spotted, and aborted, long before its final
+time.
+
+Usage, while Metafor runs:
+    from ldimpact.stream import LiveMonitor
+    monitor = LiveMonitor("res/workspace/<s_name>")
+    for n_new in monitor.follow(interval=5):
+        print(monitor.out["t_sample"][-1], monitor.out["kin"][0][-1])
+"""
+
+import os
+import time
+
+import numpy as np
+
+from .extract import split_workspace
+from .loader import FIELDS, Workspace, discover, read_layout
+from .main import post_process
+
+
+class StreamReader():
+    """StreamReader -- Follow the .ascii files of a running simulation.
+
+    Attributes:
+        sim_dir  (str)     -- Path of the simulation results.
+        fields   (tuple)   -- Names of the archived fields.
+        n_nodes  (ndarray) -- Number of nodes of each curve, (n_ring, n_curve).
+        n_frames (int)     -- Number of frames returned so far.
+    """
+
+    def __init__(self, sim_dir):
+        self.sim_dir = sim_dir
+        self.fields = ()
+        self.n_nodes = None
+        self.n_frames = 0
+
+        self._files = {}
+        self._offsets = {}
+        self._pending = {}
+        self._expected = None
+        self._complete = False
+
+    def poll(self):
+        """poll -- Read the frames appended since the previous poll.
+
+        Return:
+            ws (Workspace) -- New frames of every file, or None if there is
+                              no new complete frame.
+        """
+        if not self._complete:
+            self._discover()
+            if not self._files or (self._expected is not None and not self._expected <= set(self._files)):
+                return None
+
+        for key, path in self._files.items():
+            rows = self._read_rows(path)
+            if rows.size:
+                self._pending[key].append(rows)
+
+        n_ready = min(sum(rows.shape[0] for rows in pending) for pending in self._pending.values())
+        if n_ready == 0:
+            return None
+
+        values = {key: self._take(key, n_ready) for key in self._pending}
+        if self.n_nodes is None:
+            self._set_layout(values)
+            # The frames of a file discovered later could not be aligned
+            self._complete = True
+
+        n_ring, n_curve = self.n_nodes.shape
+        data = np.full((len(self.fields), n_ring, n_curve, n_ready, self.n_nodes.max()), np.nan)
+        for (field, i_ring, i_curve), rows in values.items():
+            if field is not None:
+                data[self.fields.index(field), i_ring, i_curve, :, :rows.shape[1]] = rows
+
+        self.n_frames += n_ready
+
+        return Workspace(values[None, 0, 0].ravel(), self.fields, self.n_nodes, data)
+
+    def _discover(self):
+        """_discover -- Follow the files created since the previous poll."""
+        if self._expected is None:
+            layout = read_layout(self.sim_dir)
+            if layout is not None:
+                self._expected = {(None, 0, 0)} | {
+                    (field, i_ring, i_curve) for field in layout["fields"]
+                    for i_ring in range(layout["n_ring"]) for i_curve in range(layout["n_curve"])
+                }
+
+        files = discover(self.sim_dir)
+        t_sample = os.path.join(self.sim_dir, "tSample.ascii")
+        if not files or not os.path.isfile(t_sample):
+            return
+
+        # The time sample is stored under the (None, 0, 0) key
+        for key, path in {**files, (None, 0, 0): t_sample}.items():
+            if key not in self._files:
+                self._files[key] = path
+                self._offsets[path] = 0
+                self._pending[key] = []
+
+    def _set_layout(self, values):
+        found = {field for field, _, _ in values if field is not None}
+        self.fields = tuple([field for field in FIELDS if field in found] + sorted(found - set(FIELDS)))
+
+        keys = [key for key in values if key[0] is not None]
+        self.n_nodes = np.zeros(
+            (1 + max(i_ring for _, i_ring, _ in keys), 1 + max(i_curve for _, _, i_curve in keys)),
+            dtype=np.intp,
+        )
+        for field, i_ring, i_curve in keys:
+            self.n_nodes[i_ring, i_curve] = values[field, i_ring, i_curve].shape[1]
+
+    def _read_rows(self, path):
+        """_read_rows -- Parse the complete rows appended to a file."""
+        with open(path, "rb") as file:
+            file.seek(self._offsets[path])
+            content = file.read()
+
+        # Only consume up to the last complete row
+        end = content.rfind(b"\n") + 1
+        self._offsets[path] += end
+        lines = content[:end].split()
+        if not lines:
+            return np.empty((0, 0))
+
+        n_col = len(content[:content.find(b"\n")].split())
+        values = np.array(lines, dtype=np.float64)
+
+        return values.reshape(-1, n_col)
+
+    def _take(self, key, n_rows):
+        """_take -- Pop the first pending rows of a file."""
+        rows = np.concatenate(self._pending[key])
+        self._pending[key] = [rows[n_rows:]] if rows.shape[0] > n_rows else []
+
+        return rows[:n_rows]
+
+
+class LiveMonitor():
+    """LiveMonitor -- Incremental post-processing of a running simulation.
+
+    Attributes:
+        reader (StreamReader) -- Reader of the appended frames.
+        out    (dict)         -- Post-processed quantities of all the frames
+                                 read so far, as returned by post_process(),
+                                 or None before the first frame.
+    """
+
+    def __init__(self, sim_dir):
+        self.reader = StreamReader(sim_dir)
+        self.out = None
+
+        # Arrays of out, over their whole capacity
+        self._buffers = None
+
+    def update(self):
+        """update -- Post-process the frames appended since the previous update.
+
+        Return:
+            n_new (int) -- Number of new frames.
+        """
+        ws = self.reader.poll()
+        if ws is None:
+            return 0
+
+        new = post_process(*split_workspace(ws))
+        if self.out is None:
+            self._buffers, self.out = new, new
+            return ws.n_time
+
+        n_old = self.out["t_sample"].size
+        self._buffers, self.out = _append(self._buffers, new, n_old)
+
+        # Relative perimeter and area variations are taken from the first
+        # frame, see compute.relative_decrease()
+        if self.out["perim"] is not None:
+            for perim_ring in self.out["perim"]:
+                for key in ("inner", "outer", "section"):
+                    values = perim_ring[key]
+                    perim_ring[key + "_diff"][n_old:] = (values[0] - values[n_old:]) / values[0]
+
+        return ws.n_time
+
+    def follow(self, interval=5.0, timeout=60.0):
+        """follow -- Update the monitor as long as the simulation goes on.
+
+        Arguments:
+            interval (float) -- Time between two updates [s].
+            timeout  (float) -- The simulation is deemed over once no frame
+                                was appended for that long [s].
+        Yield:
+            n_new (int) -- Number of new frames, after each update that
+                           brought some.
+        """
+        last_frame = time.monotonic()
+        while time.monotonic() - last_frame < timeout:
+            n_new = self.update()
+            if n_new:
+                last_frame = time.monotonic()
+                yield n_new
+            else:
+                time.sleep(interval)
+
+
+def _append(buffers, new, n_old):
+    """_append -- Append post-processed quantities along the time axis, in place.
+
+    Arguments:
+        buffers (dict)    -- Quantities of the previous frames, whose arrays
+                             may hold more rows than frames.
+        new     (dict)    -- Quantities of the new frames.
+        n_old   (int)     -- Number of previous frames.
+    Return:
+        buffers (dict) -- Buffers holding all the frames, reallocated with
+                          twice their capacity when full.
+        out     (dict) -- Views of the buffers on all the frames.
+    """
+    if isinstance(buffers, dict):
+        appended = {key: _append(buffers[key], new[key], n_old) for key in buffers}
+        return (
+            {key: buffer for key, (buffer, _) in appended.items()},
+            {key: view for key, (_, view) in appended.items()},
+        )
+    if isinstance(buffers, list):
+        # Node counts are constant, ring and curve lists are nested
+        if all(isinstance(value, (int, np.integer)) for value in buffers):
+            return buffers, buffers
+        appended = [_append(buffer, new_value, n_old) for buffer, new_value in zip(buffers, new)]
+        return [buffer for buffer, _ in appended], [view for _, view in appended]
+    if buffers is None:
+        return None, None
+
+    n_time = n_old + new.shape[0]
+    if buffers.shape[0] < n_time:
+        grown = np.empty((max(2*buffers.shape[0], n_time),) + buffers.shape[1:], dtype=np.result_type(buffers, new))
+        grown[:n_old] = buffers[:n_old]
+        buffers = grown
+    buffers[n_old:n_time] = new
+
+    return buffers, buffers[:n_time]
@@ -0,0 +1,370 @@
+"""sweep -- Parametric sweep runner of Metafor simulations.
+
+A sweep runs one Metafor description file, typically src/template.py, for
+every parameter set of a grid. The cases are launched concurrently in a
+bounded process pool, each in a fresh process and in its own workspace
+directory <sweep_dir>/case<k>. As every case already uses n_tasks TBB
+threads, the pool only holds cpu_count // n_tasks cases at once, so that
+the node is not oversubscribed. Given a thread tuning, see
+benchmark.tune_threads(), n_tasks is chosen per case after its mesh size.
+
+Once a case is over, its workspace is post-processed and reduced to a few
+scalar results, gathered with the case parameters in one table, also
+written to <sweep_dir>/results.csv. Given a ResultCache, the cases whose
+resolved parameters were already run are read from the cache instead.
+
+Usage, within the Python interpreter of Metafor:
+    from ldimpact.resultcache import ResultCache
+    from ldimpact.sweep import grid, run_sweep
+    cases = grid(poisson_ratio=[0.125, 0.3, 0.4, 0.49], final_time=[2E-4])
+    table = run_sweep("src/template.py", cases, "res/workspace/lockin_sweep",
+                      cache=ResultCache("res/cache"))
+"""
+
+import csv
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .compute import compute_displacements, compute_external_forces, compute_kinetic, compute_mean_motion
+from .extract import open_workspace, split_workspace
+from .resultcache import case_key
+
+RESULTS = "results.csv"
+PARAMS = "params.json"
+
+
+def grid(**axes):
+    """grid -- Cartesian product of parameter values.
+
+    Argument:
+        axes (list) -- Values taken by each parameter, e.g. poisson_ratio=[0.3, 0.4].
+    Return:
+        cases (list) -- One parameter dict per combination of values.
+    """
+    keys = list(axes)
+    return [dict(zip(keys, values)) for values in itertools.product(*axes.values())]
+
+
+def run_sweep(description, cases, sweep_dir, n_tasks=1, max_workers=None, metrics=None, cache=None, tuning=None,
+              watchdog=None):
+    """run_sweep -- Run one Metafor simulation per parameter set.
+
+    Arguments:
+        description (str)         -- Path of the Metafor description file.
+        cases       (list)        -- Parameter dicts given to getMetafor(p).
+        sweep_dir   (str)         -- Directory holding the case workspaces.
+        n_tasks     (int)         -- Number of TBB threads used by each case.
+        max_workers (int)         -- Number of concurrent cases, defaults to
+                                     the number of cores divided by n_tasks.
+        metrics     (callable)    -- Reduce a case workspace directory into a
+                                     dict of scalar results, defaults to
+                                     scalar_results().
+        cache       (ResultCache) -- If given, the cases whose resolved
+                                     parameters were already run are not run
+                                     again, and the new cases are run in the
+                                     cache entries rather than in sweep_dir.
+        tuning      (str)         -- Path of a report of benchmark.tune_threads().
+                                     If given, the number of threads and the
+                                     TBB switches of each case are those tuned
+                                     for its mesh size, overriding n_tasks.
+        watchdog    (Watchdog)    -- If given, the cases whose archived frames
+                                     go wrong are aborted, see watchdog.py.
+    Return:
+        table (list) -- One row dict per case, holding the case index, its
+                        parameters, the outcome of run_case() and the
+                        scalar results.
+    """
+    if metrics is None:
+        metrics = scalar_results
+
+    description = os.path.abspath(description)
+    os.makedirs(sweep_dir, exist_ok=True)
+
+    if cache is not None or tuning is not None:
+        module = load_description(description)
+    if cache is not None:
+        with open(description) as file:
+            source = file.read()
+
+    # Parallel configuration of each case
+    if tuning is None:
+        configs = [{"n_tasks": n_tasks}] * len(cases)
+    else:
+        with open(tuning) as file:
+            tuning = json.load(file)
+        configs = [
+            tuned_config(tuning, resolve_params(module, p)["mesh_mult"], p)
+            for p in cases
+        ]
+
+    # Never more threads than cores, whatever the case
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // max(config["n_tasks"] for config in configs))
+
+    # One fresh process per case, as Metafor holds global state
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers, context, max_tasks_per_child=1) as executor:
+        keys = []
+        futures = {}
+        for i_case, (p, config) in enumerate(zip(cases, configs)):
+            if cache is None:
+                key = i_case
+                case_dir = os.path.abspath(os.path.join(sweep_dir, f"case{i_case+1}"))
+                os.makedirs(case_dir, exist_ok=True)
+                with open(os.path.join(case_dir, PARAMS), "w") as file:
+                    json.dump(p, file)
+            else:
+                resolved = resolve_params(module, p)
+                key = case_key(resolved, source)
+                if key in futures or cache.get(key) is not None:
+                    keys.append(key)
+                    continue
+                case_dir = cache.reserve(key, resolved)
+            keys.append(key)
+            futures[key] = executor.submit(run_case, description, {**p, **config}, case_dir, watchdog)
+
+        table = []
+        outcomes = {}
+        for i_case, (p, key) in enumerate(zip(cases, keys)):
+            if key not in outcomes:
+                if key in futures:
+                    outcome = futures[key].result()
+                    case_dir = outcome.pop("case_dir")
+                    if outcome["status"] == "ok":
+                        outcome.update(metrics(case_dir))
+                    if cache is not None:
+                        if outcome["status"] == "ok":
+                            cache.put(key, outcome)
+                        else:
+                            cache.discard(key)
+                else:
+                    outcome = {**cache.get(key), "status": "cached"}
+                outcomes[key] = outcome
+
+            row = {"case": i_case+1, **p, **outcomes[key]}
+            if cache is not None:
+                row["key"] = key
+            table.append(row)
+
+    if cache is not None:
+        cache.evict(keep=keys)
+
+    write_table(table, os.path.join(sweep_dir, RESULTS))
+
+    return table
+
+
+def tuned_config(tuning, mesh_mult, p=None):
+    """tuned_config -- Parallel configuration of a case, from a thread tuning.
+
+    Arguments:
+        tuning    (dict)  -- Report of benchmark.tune_threads().
+        mesh_mult (float) -- Mesh multiplier of the case. The configuration
+                             tuned for the nearest mesh multiplier is used.
+        p         (dict)  -- Parameters of the case, whose TBB switches are
+                             kept if they are given.
+    Return:
+        config (dict) -- Number of threads and TBB switches of the case.
+    """
+    record = min(tuning["records"], key=lambda record: abs(record["mesh_mult"] - mesh_mult))
+    config = {"n_tasks": record["n_tasks"], "use_tbb": record["use_tbb"]}
+    if p is not None and "use_tbb" in p:
+        config["use_tbb"] = p["use_tbb"]
+
+    return config
+
+
+def load_description(description):
+    """load_description -- Import a Metafor description file as a module.
+
+    The template only imports Metafor within getMetafor(), so that its
+    params() can be called from any interpreter, within milliseconds.
+
+    Argument:
+        description (str) -- Path of the Metafor description file.
+    Return:
+        module (module) -- Imported description file.
+    """
+    spec = importlib.util.spec_from_file_location("description", description)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def resolve_params(module, p):
+    """resolve_params -- Full parameters of a case, defaults included.
+
+    Arguments:
+        module (module) -- Imported description file.
+        p      (dict)   -- Parameters given to getMetafor(p).
+    Return:
+        resolved (dict) -- Parameters returned by params(p), if the
+                           description file defines it, else p itself.
+    """
+    return module.params(p) if hasattr(module, "params") else dict(p)
+
+
+def run_case(description, p, case_dir, watchdog=None):
+    """run_case -- Run one Metafor simulation, in its own workspace directory.
+
+    Meant to be executed in a worker process, where the wrap module of
+    Metafor can be imported.
+
+    Arguments:
+        description (str)      -- Path of the Metafor description file.
+        p           (dict)     -- Parameters given to getMetafor(p).
+        case_dir    (str)      -- Workspace directory of the case.
+        watchdog    (Watchdog) -- If given, the simulation is run in a child
+                                  process, that the watchdog terminates as
+                                  soon as the archived frames go wrong.
+    Return:
+        outcome (dict) -- Status, wall time, number of time steps, peak
+                          resident memory [bytes] and workspace of the case.
+    """
+    # Metafor writes the archived values in the working directory
+    os.chdir(case_dir)
+    os.environ["OMP_NUM_THREADS"] = str(p["n_tasks"])
+
+    tic = time.perf_counter()
+    if watchdog is None:
+        outcome = integrate(description, p)
+    else:
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_integrate_child, args=(description, p, sender))
+        process.start()
+        sender.close()
+
+        try:
+            diagnostic = watchdog.watch(process, case_dir)
+        finally:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        if diagnostic is not None:
+            outcome = {"status": f"aborted: {diagnostic['check']}", "n_steps": None, "peak_rss": None}
+        elif receiver.poll():
+            outcome = receiver.recv()
+        else:
+            outcome = {"status": f"failed: exit code {process.exitcode}", "n_steps": None, "peak_rss": None}
+
+    return {
+        "status": outcome["status"], "wall_time": time.perf_counter() - tic,
+        "n_steps": outcome["n_steps"], "peak_rss": outcome["peak_rss"], "case_dir": case_dir,
+    }
+
+
+def integrate(description, p):
+    """integrate -- Build and run one Metafor simulation, in the working directory.
+
+    Arguments:
+        description (str)  -- Path of the Metafor description file.
+        p           (dict) -- Parameters given to getMetafor(p).
+    Return:
+        outcome (dict) -- Status, number of time steps and peak resident
+                          memory [bytes] of the simulation.
+    """
+    n_steps = None
+    try:
+        metafor = load_description(description).getMetafor(p)
+        ok = metafor.getTimeIntegration().integration()
+        status = "ok" if ok else "failed: integration"
+        n_steps = int(metafor.getCurrentStepNo())
+    except Exception as exc:
+        status = f"failed: {exc!r}"
+
+    return {"status": status, "n_steps": n_steps, "peak_rss": peak_rss()}
+
+
+def _integrate_child(description, p, sender):
+    sender.send(integrate(description, p))
+    sender.close()
+
+
+def peak_rss():
+    """peak_rss -- Peak resident memory of the current process.
+
+    Meaningful for a whole case as each case runs in a fresh process.
+
+    Return:
+        peak_rss (int) -- Peak resident set size [bytes], None if unknown.
+    """
+    if resource is None:
+        return None
+
+    # Kilobytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def scalar_results(sim_dir):
+    """scalar_results -- Reduce a simulation workspace into scalar results.
+
+    Argument:
+        sim_dir (str) -- Path of the simulation results.
+    Return:
+        results (dict) -- Scalar results, see reduce_workspace().
+    """
+    return reduce_workspace(open_workspace(sim_dir))
+
+
+def reduce_workspace(ws):
+    """reduce_workspace -- Reduce the archived nodal values of a simulation into scalar results.
+
+    Argument:
+        ws (Workspace) -- Archived nodal values of the whole problem.
+    Return:
+        results (dict) -- Number of frames and, per ring: maximum CG
+                          displacement, peak external force and final over
+                          initial specific kinetic energy.
+    """
+    t_sample, geom, nspeed, nfext, _ = split_workspace(ws)
+
+    # Only the results whose fields were archived
+    mdispl = fext = kin = None
+    if geom is not None and nspeed is not None:
+        _, mdispl = compute_mean_motion(nspeed, compute_displacements(geom))
+    if nfext is not None:
+        fext = compute_external_forces(nfext)
+    if nspeed is not None:
+        _, kin = compute_kinetic(nspeed)
+
+    results = {"n_frames": len(t_sample)}
+    for i_ring in range(ws.n_ring):
+        label = f"ring{i_ring+1}"
+        if mdispl is not None:
+            results[f"max_cg_displ_{label}"] = float(np.max(np.abs(mdispl[i_ring]["abs"] - mdispl[i_ring]["abs"][0])))
+        if fext is not None:
+            results[f"max_fext_{label}"] = float(np.max(fext[i_ring]["abs"]))
+        if kin is not None:
+            results[f"kin_ratio_{label}"] = float(kin[i_ring][-1] / kin[i_ring][0]) if kin[i_ring][0] else np.nan
+
+    return results
+
+
+def write_table(table, path):
+    """write_table -- Write a list of row dicts as a CSV file.
+
+    Arguments:
+        table (list) -- Row dicts, whose keys may differ between rows.
+        path  (str)  -- Path of the CSV file.
+    """
+    columns = list(dict.fromkeys(key for row in table for key in row))
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        writer.writerows(table)
@@ -0,0 +1,157 @@
+"""timestep -- Contact-driven time-step schedule of a simulation.
+
+The maximum time step of the template is set once for the whole run, to
+min_prof_cont / init_speed_magnitude: small enough for the nodes of the
+impactor never to jump over the contact detection band (PROF_CONT), see
+res/jumpContact.py, but needlessly small for the phases where no contact
+can be reached, e.g. the long post-bounce phase.
+
+This module derives a piecewise maximum time step from the archived frames
+of a previous run of the same problem, typically a coarse pilot run. For
+each contact pair between rings and each archived frame, a node at a
+distance d of a facing node, and closing on it at the speed v, must not
+travel more than d + prof_cont within one step:
+    dt <= (d + prof_cont) / v
+The allowed step of a frame is the minimum over all the node pairs of all
+the contact pairs. The steps are then rounded down to base_step * 2**k,
+shrunk in advance of the frames where they decrease, and gathered into
+phases, that getMetafor() turns into successive tsm.setNextTime() calls
+through p['time_schedule'].
+
+The self contacts of the rings are not considered, as their curves share
+end nodes.
+"""
+
+import numpy as np
+
+from .extract import open_workspace
+
+# Number of node pairs processed at once, over a chunk of frames
+_CHUNK = 2**22
+
+
+def contact_curve_pairs(contacts):
+    """contact_curve_pairs -- Curves facing each other, for each contact between rings.
+
+    Argument:
+        contacts (list) -- Contacts between rings, as in p['contacts'] of the template.
+    Return:
+        pairs (list) -- Pairs of (i_ring, curves) tuples, zero-based.
+    """
+    pairs = []
+    for kind, i, j in contacts:
+        if kind == "outer_inner":
+            pairs.append(((i-1, (0, 1)), (j-1, (2, 3))))
+        elif kind == "outer_outer":
+            pairs.append(((i-1, (2, 3)), (j-1, (2, 3))))
+        else:
+            raise ValueError(f"Unknown contact kind: {kind}")
+
+    return pairs
+
+
+def allowable_time_steps(ws, contacts, prof_cont):
+    """allowable_time_steps -- Largest time step that keeps every contact band, per frame.
+
+    The node pairs are processed by chunks of frames, so that the memory
+    does not grow with the number of frames.
+
+    Arguments:
+        ws        (Workspace) -- Archived nodal values of the whole problem.
+        contacts  (list)      -- Contacts between rings, as in p['contacts'].
+        prof_cont (float)     -- Depth of the contact detection band.
+    Return:
+        dt_allow (ndarray) -- Allowed time step at each archived frame, (n_time,).
+                              Infinite where no node closes on another one.
+    """
+    def nodes(i_ring, curves):
+        # Positions and velocities, as (n_time, n_nodes) arrays
+        pick = lambda field: np.hstack([ws.curve(field, i_ring, c) for c in curves])
+        return (
+            pick("AB_TX") + pick("RE_TX"), pick("AB_TY") + pick("RE_TY"),
+            pick("GV_TX"), pick("GV_TY"),
+        )
+
+    dt_allow = np.full(ws.n_time, np.inf)
+    for tool, target in contact_curve_pairs(contacts):
+        x_a, y_a, u_a, v_a = nodes(*tool)
+        x_b, y_b, u_b, v_b = nodes(*target)
+
+        n_frame = max(1, _CHUNK // (x_a.shape[1] * x_b.shape[1]))
+        for i0 in range(0, ws.n_time, n_frame):
+            frames = slice(i0, i0 + n_frame)
+
+            # Relative positions and velocities, (n_frame, n_a, n_b)
+            dx = x_b[frames, None, :] - x_a[frames, :, None]
+            dy = y_b[frames, None, :] - y_a[frames, :, None]
+            du = u_b[frames, None, :] - u_a[frames, :, None]
+            dv = v_b[frames, None, :] - v_a[frames, :, None]
+
+            dist = np.hypot(dx, dy)
+            closing = -(dx*du + dy*dv) / np.maximum(dist, np.finfo(float).tiny)
+
+            with np.errstate(divide="ignore"):
+                dt_pair = np.where(closing > 0, (dist + prof_cont) / closing, np.inf)
+            dt_allow[frames] = np.minimum(dt_allow[frames], dt_pair.min(axis=(1, 2)))
+
+    return dt_allow
+
+
+def time_step_schedule(t_sample, dt_allow, base_step, max_level=6, safety=0.5, lookahead=2):
+    """time_step_schedule -- Piecewise maximum time step from the allowed steps.
+
+    Arguments:
+        t_sample  (ndarray) -- Time sample of the archived frames.
+        dt_allow  (ndarray) -- Allowed time step at each archived frame.
+        base_step (float)   -- Smallest time step, the current worst case
+                               min_prof_cont / init_speed_magnitude.
+        max_level (int)     -- The steps are at most base_step * 2**max_level.
+        safety    (float)   -- Factor applied to the allowed steps.
+        lookahead (int)     -- Number of frames over which a step decrease
+                               is anticipated.
+    Return:
+        schedule (list) -- Phases, as (end_time, max_time_step) tuples, empty
+                           with less than two frames, for which the maximum
+                           time step of the template is kept.
+    """
+    if t_sample.size < 2:
+        return []
+
+    # Between two frames, keep the most restrictive of both
+    dt_span = np.minimum(dt_allow[:-1], dt_allow[1:]) * safety
+
+    with np.errstate(divide="ignore"):
+        level = np.floor(np.log2(dt_span / base_step))
+    level = np.clip(level, 0, max_level).astype(int)
+
+    # Shrink the step before it is needed
+    padded = np.concatenate((level, np.full(lookahead, level[-1])))
+    level = np.min([padded[k:k+level.size] for k in range(lookahead+1)], axis=0)
+
+    schedule = []
+    for i_span, lvl in enumerate(level):
+        dt_max = float(base_step * 2.0**lvl)
+        if schedule and schedule[-1][1] == dt_max:
+            schedule[-1] = (float(t_sample[i_span+1]), dt_max)
+        else:
+            schedule.append((float(t_sample[i_span+1]), dt_max))
+
+    return schedule
+
+
+def schedule_from_workspace(sim_dir, contacts, prof_cont, base_step, **kwargs):
+    """schedule_from_workspace -- Time-step schedule from a previous run.
+
+    Arguments:
+        sim_dir   (str)   -- Path of the results of the previous run.
+        contacts  (list)  -- Contacts between rings, as in p['contacts'].
+        prof_cont (float) -- Depth of the thinnest contact detection band.
+        base_step (float) -- Smallest time step.
+        kwargs            -- Options of time_step_schedule().
+    Return:
+        schedule (list) -- Phases, to be given as p['time_schedule'].
+    """
+    ws = open_workspace(sim_dir)
+    dt_allow = allowable_time_steps(ws, contacts, prof_cont)
+
+    return time_step_schedule(ws.t_sample, dt_allow, base_step, **kwargs)
@@ -0,0 +1,76 @@
+"""util -- Utilities that does not provide direct post-processing functionalities.
+
+Python counterpart of the Matlab files stored in src/pprocess/util/.
+"""
+
+
+def load_defaults():
+    """load_defaults -- Default execution parameters used throughout the source code.
+
+    Parameters ending with an underscore are internals,
+    and are not meant to be changed.
+
+    Return:
+        default (dict) -- Default code execution parameters.
+    """
+    default = {}
+
+    # Project structure.
+    #   Those are the paths of the main project directories. These paths are
+    #   defined at runtime, by the main function of the post-processing code.
+    #   root_dir_ -> Root of the project
+    #   res_dir_  -> Resources: saved Metafor simulations
+    #   out_dir_  -> Outputs: saved post-processing results
+    default["root_dir_"] = ""
+    default["res_dir_"] = ""
+    default["out_dir_"] = ""
+
+    # Number of rings to extract.
+    #   None extracts all the rings of the simulation, whatever their number.
+    default["n_ring_"] = None
+
+    # Number of curves composing one ring.
+    #   None extracts all the curves archived for each ring.
+    default["n_curve_"] = None
+
+    # Simulation name.
+    #   Should match the name of the desired Metafor
+    #   simulation, located in the res/ directory.
+    default["s_name"] = "template"
+
+    # Particular time of the simulation
+    # where one desire getting the results.
+    default["t_focus"] = 7E-4
+
+    # Binary cache of the parsed simulation outputs.
+    #   If True, the parsed .ascii files are cached in the .cache/ subdirectory
+    #   of the simulation workspace, and memory-mapped on the next runs.
+    default["cache"] = True
+
+    # Output options.
+    #   's' -> [S]ave generated data.
+    default["outs"] = "s"
+
+    return default
+
+
+def set_running_arguments():
+    """set_running_arguments -- Override the default code execution parameters.
+
+    The code execution parameters are set in the section below,
+    by speficying instructions of the form:
+        run_arg["<param>"] = <value>
+    where <param> is one of the code execution parameter name,
+    whose default <value> is stored in load_defaults().
+
+    Return:
+        run_arg (dict) -- User code execution parameters.
+    """
+    # Make sure the function returns at least an empty dict
+    run_arg = {}
+
+    # ===== WRITE THE CONFIG HERE =====
+
+    # ==================================
+
+    return run_arg
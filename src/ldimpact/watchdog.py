@@ -0,0 +1,222 @@
+"""watchdog -- Early termination of the simulations that go wrong.
+
+A too low contact penalty lets the rings cross each other, see
+res/penContact.py, and a too large time step lets the nodes jump over the
+contact detection band, see res/jumpContact.py. Such runs still go on up
+to their final time, producing garbage.
+
+The Watchdog follows the frames archived by a running simulation, through
+a stream.LiveMonitor, and checks each new frame for the signs of failure:
+    interpenetration -- a node of a ring lies deeper than a fraction of the
+                        ring thickness inside a ring it is in contact with
+    kinetic growth   -- the kinetic energy of the whole problem, weighted
+                        by the ring masses of layout.json, grows beyond a
+                        factor of its initial value
+    perimeter        -- an inner or outer perimeter shrinks by more than
+                        a fraction of its initial value
+On the first failure, the simulation process is terminated, and the
+diagnostic is written in the workspace, as watchdog.json.
+
+Usage, through the sweep runner:
+    run_sweep("src/template.py", cases, sweep_dir, watchdog=Watchdog())
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from .extract import open_layout
+from .stream import LiveMonitor
+
+DIAGNOSTIC = "watchdog.json"
+
+
+class Watchdog():
+    """Watchdog -- Checks of the archived frames of a running simulation.
+
+    Attributes:
+        interval         (float) -- Time between two checks [s].
+        max_penetration  (float) -- Allowed penetration depth, as a fraction
+                                    of the thickness of the penetrated ring.
+        max_kin_growth   (float) -- Allowed ratio of the kinetic energy over
+                                    its initial value.
+        max_perim_shrink (float) -- Allowed relative decrease of a perimeter.
+    """
+
+    def __init__(self, interval=5.0, max_penetration=0.5, max_kin_growth=1.5, max_perim_shrink=0.5):
+        self.interval = interval
+        self.max_penetration = max_penetration
+        self.max_kin_growth = max_kin_growth
+        self.max_perim_shrink = max_perim_shrink
+
+    def watch(self, process, sim_dir):
+        """watch -- Check a simulation as long as its process runs.
+
+        Arguments:
+            process (Process) -- Process running the simulation.
+            sim_dir (str)     -- Workspace directory of the simulation.
+        Return:
+            diagnostic (dict) -- Failure that aborted the simulation, also
+                                 written in the workspace, or None.
+        """
+        monitor = LiveMonitor(sim_dir)
+        layout = None
+
+        while process.is_alive():
+            process.join(self.interval)
+            n_new = monitor.update()
+            if not n_new:
+                continue
+
+            if layout is None:
+                layout = open_layout(sim_dir)
+            diagnostic = self.check(monitor.out, layout, n_new)
+            if diagnostic is not None:
+                process.terminate()
+                process.join()
+                with open(os.path.join(sim_dir, DIAGNOSTIC), "w") as file:
+                    json.dump(diagnostic, file, indent=4)
+                return diagnostic
+
+        return None
+
+    def check(self, out, layout=None, n_new=1):
+        """check -- Check the last frames of a simulation.
+
+        Arguments:
+            out    (dict) -- Post-processed quantities, see main.post_process().
+            layout (dict) -- Ring layout of the simulation, needed to check
+                             the kinetic growth and the interpenetration.
+            n_new  (int)  -- Number of frames to check, at the end of out.
+        Return:
+            diagnostic (dict) -- Failed check, frame, time and value, or None.
+        """
+        t_sample = out["t_sample"]
+        first = len(t_sample) - n_new
+
+        def failure(check, i_frame, value, **details):
+            return {
+                "check": check, "frame": int(i_frame), "time": float(t_sample[i_frame]),
+                "value": float(value), **details, "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+
+        if out["kin"] is not None and layout is not None:
+            # Specific kinetic energies weighted by the ring masses, see src/analysis/plasticity.m
+            masses = [
+                ring["mass_density"] * np.pi * (ring["outer_radius"]**2 - ring["inner_radius"]**2)
+                for ring in layout["rings"]
+            ]
+            total = sum(0.5 * mass * kin for mass, kin in zip(masses, out["kin"]))
+            if total[0] > 0:
+                growth = total[first:] / total[0]
+                if np.any(growth > self.max_kin_growth):
+                    i_frame = first + np.argmax(growth > self.max_kin_growth)
+                    return failure("kinetic_growth", i_frame, total[i_frame] / total[0])
+
+        if out["perim"] is not None:
+            for i_ring, perim_ring in enumerate(out["perim"]):
+                for side in ("inner", "outer"):
+                    shrink = perim_ring[side + "_diff"][first:]
+                    if np.any(shrink > self.max_perim_shrink):
+                        i_frame = first + np.argmax(shrink > self.max_perim_shrink)
+                        return failure("perimeter", i_frame, perim_ring[side + "_diff"][i_frame],
+                                       ring=i_ring+1, side=side)
+
+        if out["displ"] is not None and layout is not None:
+            for i_frame in range(first, len(t_sample)):
+                for kind, i, j in layout["contacts"]:
+                    depth = penetration_depth(out["displ"], kind, i-1, j-1, i_frame)
+                    thickness = min(
+                        layout["rings"][i_ring]["outer_radius"] - layout["rings"][i_ring]["inner_radius"]
+                        for i_ring in (i-1, j-1)
+                    )
+                    if depth > self.max_penetration * thickness:
+                        return failure("interpenetration", i_frame, depth, contact=[kind, i, j])
+
+        return None
+
+
+def contour(displ_ring, curves, i_frame):
+    """contour -- Closed contour of a ring, at one frame.
+
+    Arguments:
+        displ_ring (list)  -- Positions of the nodes of the ring curves.
+        curves     (tuple) -- Curves forming the contour, head to tail.
+        i_frame    (int)   -- Index of the frame.
+    Return:
+        x, y (ndarray) -- Coordinates of the contour vertices.
+    """
+    x = np.concatenate([displ_ring[i_curve]["tx"][i_frame, :-1] for i_curve in curves])
+    y = np.concatenate([displ_ring[i_curve]["ty"][i_frame, :-1] for i_curve in curves])
+
+    return x, y
+
+
+def penetration_depth(displ, kind, i_ring, j_ring, i_frame):
+    """penetration_depth -- Deepest penetration between two rings in contact.
+
+    Arguments:
+        displ   (list) -- Positions of the nodes of all the rings.
+        kind    (str)  -- Kind of contact, "outer_inner" if ring j lies
+                          inside ring i, or "outer_outer".
+        i_ring  (int)  -- Zero-based index of the first ring.
+        j_ring  (int)  -- Zero-based index of the second ring.
+        i_frame (int)  -- Index of the frame.
+    Return:
+        depth (float) -- Largest distance of a node of one ring to the
+                         contour it has crossed, 0 if none has.
+    """
+    inner = (0, 1)
+    outer = (2, 3)
+
+    if kind == "outer_inner":
+        # The outer contour of j must stay within the inner contour of i
+        px, py = contour(displ[j_ring], outer, i_frame)
+        cx, cy = contour(displ[i_ring], inner, i_frame)
+        crossed = ~points_in_polygon(px, py, cx, cy)
+        return _max_distance(px[crossed], py[crossed], cx, cy)
+
+    depth = 0.0
+    for a, b in ((i_ring, j_ring), (j_ring, i_ring)):
+        px, py = contour(displ[a], outer, i_frame)
+        cx, cy = contour(displ[b], outer, i_frame)
+        crossed = points_in_polygon(px, py, cx, cy)
+        depth = max(depth, _max_distance(px[crossed], py[crossed], cx, cy))
+
+    return depth
+
+
+def points_in_polygon(px, py, cx, cy):
+    """points_in_polygon -- Whether points lie inside a closed polygon (even-odd rule).
+
+    Arguments:
+        px, py (ndarray) -- Coordinates of the points, (n,).
+        cx, cy (ndarray) -- Coordinates of the polygon vertices, (m,).
+    Return:
+        inside (ndarray) -- Boolean mask of the points, (n,).
+    """
+    x0, y0 = cx[None, :], cy[None, :]
+    x1, y1 = np.roll(cx, -1)[None, :], np.roll(cy, -1)[None, :]
+    px, py = px[:, None], py[:, None]
+
+    straddle = (y0 > py) != (y1 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+
+    return np.count_nonzero(straddle & (px < x_cross), axis=1) % 2 == 1
+
+
+def _max_distance(px, py, cx, cy):
+    """_max_distance -- Largest distance of points to the edges of a closed polygon."""
+    if px.size == 0:
+        return 0.0
+
+    x0, y0 = cx[None, :], cy[None, :]
+    dx, dy = np.roll(cx, -1)[None, :] - x0, np.roll(cy, -1)[None, :] - y0
+    length2 = np.maximum(dx**2 + dy**2, np.finfo(float).tiny)
+    s = np.clip(((px[:, None] - x0)*dx + (py[:, None] - y0)*dy) / length2, 0, 1)
+    dist = np.hypot(px[:, None] - x0 - s*dx, py[:, None] - y0 - s*dy)
+
+    return float(dist.min(axis=1).max())
@@ -12,6 +12,14 @@ function [tSample, Geom, NSpeed, NFExt, NFInt] = extract_nodal_values(RunArg)
 
 simDir = fullfile(RunArg.resDir_, "workspace", RunArg.sName);
 
+% Ring layout of the simulation, written by the template
+layoutFile = fullfile(simDir, "layout.json");
+if isfile(layoutFile)
+	Layout = jsondecode(fileread(layoutFile));
+	RunArg.nRing_  = Layout.n_ring;
+	RunArg.nCurve_ = Layout.n_curve;
+end
+
 tSample = load(fullfile(simDir, "tSample" + ".ascii"));
 
 Geom  = cell(1, RunArg.nRing_);
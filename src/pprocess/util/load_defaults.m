@@ -15,9 +15,11 @@ Default.resDir_  = "";
 Default.outDir_  = "";
 
 % Number of rings to extract.
+%   Read from the layout.json file of the simulation, if it exists.
 Default.nRing_ = 3;
 
 % Number of curves composing one ring.
+%   Read from the layout.json file of the simulation, if it exists.
 Default.nCurve_ = 6;
 
 % Simulation name.
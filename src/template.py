@@ -2,25 +2,38 @@
 
 This template is used as a reference Metafor description file,
 for running different simulations of the three-rings impact problem.
-
-For each of the simulations that were carried out, this file is copied
-in the res/ directory, under an appropriate name. This file is then
-modified accordingly to the parameters of the desired problem.
+Any number of rings can be simulated, see ldimpact.scene.
+
+The whole problem is built by getMetafor(p), from the parameters returned
+by params(p): the entries of the dict p override the reference values
+stored in params(). A fresh Metafor object is built on each call with new
+parameters, so that a sweep driver can build many variants of the problem
+from this single module, e.g.:
+    metafor = getMetafor({'poisson_ratio': 0.4995, 'final_time': 2E-4})
+Metafor is only imported by getMetafor(), so that params(p) can be called
+from any Python interpreter.
+
+For each of the simulations that were carried out, this file was copied
+in the res/ directory, under an appropriate name, and modified accordingly
+to the parameters of the desired problem.
 """
 
+import functools
+import json
 import math
+import time
 
-from wrap import *
-
-# Instantiate the main Metafor and Domain objects
-metafor = Metafor()
-domain = metafor.getDomain()
+# The python file aims to return the main Metafor object through getMetafor(),
+# defined at the end of this file. The rest of this file implement the Metafor
+# object, which can thus be seen as a data structure containing all the FE
+# problem description.
+metafor = None
 
-# The python file aims to return the main Metafor object through this function.
-# The rest of this file implement the Metafor object, which can thus be seen as
-# a data structure containing all the FE problem description.
-def getMetafor(p={}):
-    return metafor
+# NOTE:
+# The wrap module of Metafor is only imported by getMetafor(), see
+# import_wrap(). Importing this file is thus cheap, and does not require
+# Metafor: tooling can call params(p) to validate or hash the parameters
+# of a case without building anything.
 
 # WARN:
 # In this python description file, choice has been made to specify geometric
@@ -33,40 +46,286 @@ def getMetafor(p={}):
 # Energy  -> [mJ]
 # Density -> [t/mm³]
 
-# 1. INSTANTIATE THE METAFOR OBJECTS {{{1
-
-# Geometry
-geometry = domain.getGeometry()
-pointset = geometry.getPointSet()
-curveset = geometry.getCurveSet()
-wireset  = geometry.getWireSet()
-sideset  = geometry.getSideSet()
+# 0. SIMULATION PARAMETERS {{{1
 
-# Material
-# http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/elements/volumes/iso_hypo_materials
-materials = domain.getMaterialSet()
+def params(q={}):
+    """params -- Parameters of the simulation.
 
-# Constitutive law
-# http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/elements/volumes/yield_stress
-laws = domain.getMaterialLawSet()
-
-# Initial conditions
-initial_conditions = metafor.getInitialConditionSet()
+    The reference values stored below are overridden by the entries of q.
+    A ring parameter given at the top level of q, e.g. q['poisson_ratio'],
+    applies to all the rings. A dict given under q['ring<i>'] is merged into
+    the parameters of ring i only, e.g. q['ring2'] = {'material': 'plastic'}.
+    The whole list of rings can also be replaced through q['rings'].
+    """
+    p = {}
+
+    # Rings, numbered from 1 in the order of the list.
+    #
+    # INFO: reference paper values:
+    # - center       = (-7.9, 8.5) | (7.9, -8.5) | (0, 0)
+    # - inner_radius = 8           | 10          | 26
+    # - outer_radius = 10          | 12          | 30
+    #
+    # INFO: reference paper values:
+    # - constitutive_material = ElastHypoMaterial,
+    # - mass_density          = 1e-7  | 1e-8 | 1e-6
+    # - elastic_modulus       = 10E3  | 2250 | 288E3
+    # - poisson_ratio         = 0.125 | 0.125| 0.125
+    #
+    # The numbers of elements are multiplied by p['mesh_mult'].
+    # The material is either 'elastic' or 'plastic' (perfectly plastic,
+    # of yield stress ih_sigel).
+    p['rings'] = [
+        dict(
+            center=(-7.9, 8.5), inner_radius=8, outer_radius=10, alpha=180, theta=45,
+            nelem_radial=1, nelem_contour_coarse=4, nelem_contour_fine=12,
+            material='elastic', mass_density=1e-7, elastic_modulus=10E3, poisson_ratio=0.125,
+            ih_sigel=None,
+        ),
+        dict(
+            center=(7.9, -8.5), inner_radius=10, outer_radius=12, alpha=180, theta=0,
+            nelem_radial=1, nelem_contour_coarse=12, nelem_contour_fine=12,
+            material='elastic', mass_density=1e-8, elastic_modulus=2250, poisson_ratio=0.125,
+            ih_sigel=None,
+        ),
+        dict(
+            center=(0, 0), inner_radius=26, outer_radius=30, alpha=90, theta=45,
+            nelem_radial=1, nelem_contour_coarse=10, nelem_contour_fine=12,
+            material='elastic', mass_density=1e-6, elastic_modulus=288E3, poisson_ratio=0.125,
+            ih_sigel=None,
+        ),
+    ]
+
+    # Mesh multiplication factor, to globally
+    # increase or decrease the number of elements.
+    p['mesh_mult'] = 3
+
+    # Volume integration method of the elements: 'SRIPR' or 'STD'.
+    p['volume_integration'] = 'SRIPR'
+
+    # Contact law, shared by all the rings: 'frictionless' or 'coulomb'.
+    # INFO: reference paper value: coef_frot = 0.3
+    p['contact_law'] = 'frictionless'
+    p['pen_normale'] = 1E6
+    p['pen_tangent'] = 1E6
+    p['coef_frot_dyn'] = 0.3
+    p['coef_frot_sta'] = 0.3
+
+    # Fraction of the ring tickness that should be used for the contact depth
+    p['prof_contact_fraction'] = 1/5
+
+    # Use the single pass algorithm for the contacts between rings.
+    p['single_pass'] = False
+
+    # Skip the contacts between curves that cannot meet, see section 4.
+    # Only pays off for large scenes, the three reference rings can all meet.
+    p['prune_contacts'] = True
+
+    # Contacts between rings, as (kind, ring, ring) triplets,
+    # where kind is either 'outer_inner' or 'outer_outer'.
+    p['contacts'] = [
+        ('outer_inner', 3, 1),
+        ('outer_inner', 3, 2),
+        ('outer_outer', 1, 2),
+    ]
+
+    # Ring whose outer side is clamped (a number, or a list of numbers).
+    p['fixed_ring'] = 3
+
+    # Ring that is given the initial speed (a number, or a list of numbers).
+    # INFO: reference paper values: (30mm/ms, -30mm/ms)
+    p['impactor_ring'] = 1
+    p['init_speed'] = (30E3, -30E3)
+
+    # Initial and final times.
+    # final_time = 2E-4  # for small tests
+    # final_time = 3E-3  # after bounce
+    p['initial_time'] = 0.0
+    p['final_time'] = 8E-4  # Start to rebounce
+
+    # Initial and maximum time steps.
+    # If None, they are set so that the ring nodes never jump
+    # over the contact detection area, see section 6.
+    p['time_step'] = None
+    p['max_time_step'] = None
+
+    # Schedule of maximum time steps, as (end_time, max_time_step) phases.
+    # If None, max_time_step is used for the whole run.
+    # See ldimpact.timestep.schedule_from_workspace().
+    p['time_schedule'] = None
+
+    # Number of intemediate simulation state to save.
+    p['n_intermediate'] = 199
+
+    # Schedule of archiving intervals, as (end_time, frame_interval) phases.
+    # If None, the n_intermediate states are equally spaced over the run.
+    # See ldimpact.framerate.frame_schedule_from_workspace().
+    p['archive_schedule'] = None
+
+    # Nodal fields to archive, as the name of one of ARCHIVE_PROFILES,
+    # or as a list of fields, e.g. ['GV']. See section 7.
+    p['archive_profile'] = 'full'
+
+    # Residual tolerance
+    p['res_tol'] = 1E-4  # default is 1E-4 (chap. 11)
+
+    # Number of threads used by Metafor (TBB tasks).
+    # If None, the TBB default is kept, i.e. all the cores of the node.
+    p['n_tasks'] = None
+
+    # Parallel (TBB) assembly of the vectors, of the matrices and of the
+    # contact interactions. See ldimpact.benchmark.tune_threads().
+    p['use_tbb'] = {
+        'vector': True,
+        'matrix': True,
+        'contact': True,
+    }
+
+    # Time each build phase of getMetafor(), and count the Metafor objects
+    # it creates. The table is written in PROFILE_FILE, in the workspace.
+    p['profile'] = False
+
+    # Set and toggle here what has to be debugged.
+    p['debug'] = {
+        'geometry': False,
+        'mesh': False,
+    }
+
+    # Override the reference values
+    ring_keys = set(p['rings'][0])
+    if 'rings' in q:
+        p['rings'] = [dict(ring) for ring in q['rings']]
+    for key, value in q.items():
+        if key == 'rings':
+            continue
+        elif key in ring_keys:
+            for ring in p['rings']:
+                ring[key] = value
+        elif key.startswith('ring') and key[4:].isdigit():
+            p['rings'][int(key[4:])-1].update(value)
+        else:
+            p[key] = value
+
+    return p
+
+def ring_numbers(value):
+    """Ring numbers given either as a single number or as a list of numbers."""
+    return [value] if isinstance(value, int) else list(value)
 
-# Time integration
-# http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/integration/general/time_step
-tsm = metafor.getTimeStepManager()
-mim = metafor.getMechanicalIterationManager()
+# 1. INSTANTIATE THE METAFOR OBJECTS {{{1
 
-# Archiving - Save the desired quantities in .ascii files.
-# http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/results/courbes_res
-values_manager = metafor.getValuesManager()
-fac_values_manager = metafor.getFacValuesManager()
+def import_wrap():
+    """Import the Metafor module in the namespace of this file, as `from wrap import *`.
 
-# Use Metafor multiprocessing capabilities
-StrVectorBase.useTBB()
-StrMatrixBase.useTBB()
-ContactInteraction.useTBB()
+    As the star import used to come first, the names defined by this file
+    take precedence over those of wrap.
+    """
+    import wrap
+
+    names = getattr(wrap, '__all__', None)
+    if names is None:
+        names = [name for name in vars(wrap) if not name.startswith('_')]
+    namespace = globals()
+    namespace.update((name, getattr(wrap, name)) for name in names if name not in namespace)
+
+def instantiate_metafor(p):
+    """Instantiate the main Metafor object and bind its main components."""
+    global metafor, domain, geometry, pointset, curveset, wireset, sideset
+    global materials, laws, initial_conditions, tsm, mim
+    global values_manager, fac_values_manager
+
+    # Instantiate the main Metafor and Domain objects
+    metafor = Metafor()
+    domain = metafor.getDomain()
+
+    # Geometry
+    geometry = domain.getGeometry()
+    pointset = geometry.getPointSet()
+    curveset = geometry.getCurveSet()
+    wireset  = geometry.getWireSet()
+    sideset  = geometry.getSideSet()
+
+    # Material
+    # http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/elements/volumes/iso_hypo_materials
+    materials = domain.getMaterialSet()
+
+    # Constitutive law
+    # http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/elements/volumes/yield_stress
+    laws = domain.getMaterialLawSet()
+
+    # Initial conditions
+    initial_conditions = metafor.getInitialConditionSet()
+
+    # Time integration
+    # http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/integration/general/time_step
+    tsm = metafor.getTimeStepManager()
+    mim = metafor.getMechanicalIterationManager()
+
+    # Archiving - Save the desired quantities in .ascii files.
+    # http://metafor.ltas.ulg.ac.be/dokuwiki/doc/user/results/courbes_res
+    values_manager = metafor.getValuesManager()
+    fac_values_manager = metafor.getFacValuesManager()
+
+    # Use Metafor multiprocessing capabilities
+    if p['use_tbb']['vector']:
+        StrVectorBase.useTBB()
+    if p['use_tbb']['matrix']:
+        StrMatrixBase.useTBB()
+    if p['use_tbb']['contact']:
+        ContactInteraction.useTBB()
+    if p['n_tasks'] is not None:
+        setNumTasks(p['n_tasks'])
+
+# PROFILING OPTIONS {{{1
+
+# Per-phase timing table of the build, written in the workspace directory
+PROFILE_FILE = 'profile.json'
+
+# Ring numeric labels, whose increments count the objects created by a phase
+PROFILED_IDS = ('id_point', 'id_curve', 'id_wire', 'id_side', 'id_material', 'id_law', 'id_interaction')
+
+# Timing table of the current build, None when profiling is disabled
+_profile = None
+
+def profiled(func):
+    """Time the calls of a build phase, when p['profile'] is enabled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _profile is None:
+            return func(*args, **kwargs)
+
+        ids = [getattr(Ring, name) for name in PROFILED_IDS]
+        tic = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            entry = _profile.setdefault(func.__qualname__, {'calls': 0, 'time': 0.0})
+            entry['calls'] += 1
+            entry['time'] += time.perf_counter() - tic
+            for name, id_before in zip(PROFILED_IDS, ids):
+                created = getattr(Ring, name) - id_before
+                if created:
+                    key = name[3:] + 's'
+                    entry[key] = entry.get(key, 0) + created
+
+    return wrapper
+
+def profile_count(phase, key, count):
+    """Count objects created by a phase that are not labelled by Ring."""
+    if _profile is not None:
+        entry = _profile.setdefault(phase, {'calls': 0, 'time': 0.0})
+        entry[key] = entry.get(key, 0) + count
+
+def write_profile(p, total_time):
+    """Write the timing table of the build in PROFILE_FILE."""
+    report = {
+        'n_ring': len(p['rings']),
+        'mesh_mult': p['mesh_mult'],
+        'total_time': total_time,
+        'phases': dict(sorted(_profile.items(), key=lambda item: -item[1]['time'])),
+    }
+    with open(PROFILE_FILE, 'w') as file:
+        json.dump(report, file, indent=4)
 
 # 2. DEFINE AND IMPLEMENT THE RING CLASS {{{1
 
@@ -74,6 +333,31 @@ ContactInteraction.useTBB()
 # It is advised to refer to the schematic in the report that shows the
 # notations and conventions used to define the metafor Ring class.
 
+def arc_bbox(center, start, mid, end):
+    """Bounding box (xmin, ymin, xmax, ymax) of the arc from start to end through mid."""
+    radius = math.dist(center, start)
+    angle = lambda pt: math.atan2(pt[1]-center[1], pt[0]-center[0])
+    a_start, a_mid, a_end = angle(start), angle(mid), angle(end)
+
+    # Sweep the arc counterclockwise, from a_start over span
+    span = (a_end - a_start) % (2*math.pi)
+    if (a_mid - a_start) % (2*math.pi) > span:
+        a_start, span = a_end, 2*math.pi - span
+
+    # The extremes are reached at the end points, or on the axes
+    points = [start, end]
+    for k in range(4):
+        if (k*math.pi/2 - a_start) % (2*math.pi) <= span:
+            points.append((center[0] + radius*math.cos(k*math.pi/2),
+                           center[1] + radius*math.sin(k*math.pi/2)))
+
+    return line_bbox(*points)
+
+def line_bbox(*points):
+    """Bounding box (xmin, ymin, xmax, ymax) of a set of points."""
+    xs, ys = [pt[0] for pt in points], [pt[1] for pt in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
 class Ring():
     """Ring -- Implement a 2D ring.
 
@@ -91,12 +375,26 @@ class Ring():
     id_wire        = 1
     id_side        = 1
     id_material    = 1
+    id_law         = 1
     id_interaction = 1  # FieldApplicator and Interaction
 
     def __init__(self):
         self.id = Ring.id_ring
         Ring.id_ring += 1
 
+    @classmethod
+    def reset_ids(cls):
+        """Restart the numeric labels, for a new Metafor object."""
+        cls.id_ring        = 1
+        cls.id_point       = 1
+        cls.id_curve       = 1
+        cls.id_wire        = 1
+        cls.id_side        = 1
+        cls.id_material    = 1
+        cls.id_law         = 1
+        cls.id_interaction = 1
+
+    @profiled
     def build_geometry(self, center, inner_radius, outer_radius, alpha=180, theta=0):
         self.ri = inner_radius
         self.ro = outer_radius
@@ -128,6 +426,16 @@ class Ring():
         for idx, pt in enumerate(_point):
             _point[idx] = (pt[0]+center[0], pt[1]+center[1])
 
+        # Bounding boxes of the curves, used to prune the contacts
+        self.center = center
+        self.bbox = [None] * 7
+        self.bbox[1] = arc_bbox(center, _point[1], _point[2], _point[3])
+        self.bbox[2] = arc_bbox(center, _point[3], _point[4], _point[1])
+        self.bbox[3] = arc_bbox(center, _point[5], _point[6], _point[7])
+        self.bbox[4] = arc_bbox(center, _point[7], _point[8], _point[5])
+        self.bbox[5] = line_bbox(_point[5], _point[1])
+        self.bbox[6] = line_bbox(_point[3], _point[7])
+
         # Define the computed points in Metafor
         point[1] = pointset.define(Ring.id_point+0, *_point[1])
         point[2] = pointset.define(Ring.id_point+1, *_point[2])
@@ -179,6 +487,7 @@ class Ring():
         self.wire = wire
         self.side = side
 
+    @profiled
     def build_mesh(self, nelem_radial=5, nelem_contour_coarse=40, nelem_contour_fine=40):
         # Meshing the Curve objects
         SimpleMesher1D(self.curve[1]).execute(nelem_contour_coarse)
@@ -192,6 +501,11 @@ class Ring():
         TransfiniteMesher2D(self.side[1]).execute(True)
         TransfiniteMesher2D(self.side[2]).execute(True)
 
+        n_contour = nelem_contour_coarse + nelem_contour_fine
+        profile_count('Ring.build_mesh', 'nodes', (nelem_radial+1) * n_contour)
+        profile_count('Ring.build_mesh', 'elements', nelem_radial * n_contour)
+
+    @profiled
     def build_elastic_material(
             self,
             mass_density, elastic_modulus, poisson_ratio):
@@ -205,6 +519,7 @@ class Ring():
 
         Ring.id_material += 1
 
+    @profiled
     def build_perfectly_plastic_material(
             self,
             mass_density, elastic_modulus, poisson_ratio, ih_sigel):
@@ -215,20 +530,25 @@ class Ring():
         self.material.put(MASS_DENSITY,    mass_density)
         self.material.put(ELASTIC_MODULUS, elastic_modulus)
         self.material.put(POISSON_RATIO,   poisson_ratio)
-        self.material.put(YIELD_NUM,       1)
-        self.law = laws.define(1, LinearIsotropicHardening)
+        self.material.put(YIELD_NUM,       Ring.id_law)
+        self.law = laws.define(Ring.id_law, LinearIsotropicHardening)
         self.law.put(IH_SIGEL, ih_sigel)
         self.law.put(IH_H, 0.0)  # No isotropic hardening.
 
         Ring.id_material += 1
+        Ring.id_law      += 1
 
-    def build_element(self, elem_type):
+    @profiled
+    def build_element(self, elem_type, vol_int_meth=None):
         self.id_field = Ring.id_interaction
 
+        if vol_int_meth is None:
+            vol_int_meth = VES_CMVIM_SRIPR
+
         # Properties of the finite elements
         elem_prop = ElementProperties(elem_type)
         elem_prop.put(MATERIAL, self.id_constitutive_material)
-        elem_prop.put(CAUCHYMECHVOLINTMETH, VES_CMVIM_SRIPR)
+        elem_prop.put(CAUCHYMECHVOLINTMETH, vol_int_meth)
 
         # Build the continuum of elements
         field_app = FieldApplicator(self.id_field)
@@ -239,6 +559,7 @@ class Ring():
 
         Ring.id_interaction += 1
 
+    @profiled
     def build_frictionless_contact(self, pen_normale, prof_cont):
         self.id_contact_material = Ring.id_material
 
@@ -253,6 +574,7 @@ class Ring():
 
         Ring.id_material += 1
 
+    @profiled
     def build_coulomb_contact(
             self, pen_normale, pen_tangent,
             prof_cont, coef_frot_dyn, coef_frot_sta):
@@ -272,6 +594,7 @@ class Ring():
 
         Ring.id_material += 1
 
+    @profiled
     def build_self_contact(self):
         contact_11 = ScContactInteraction(Ring.id_interaction)
         contact_22 = ScContactInteraction(Ring.id_interaction+1)
@@ -293,232 +616,276 @@ class Ring():
 
         Ring.id_interaction += 3
 
-# 3. CREATE THE THREE RINGS {{{1
-
-# 3.1. Instantiate the three main Ring objects
-
-ring_1 = Ring()
-ring_2 = Ring()
-ring_3 = Ring()
 
-# 3.2. Build the geometries
-#
-# INFO: reference paper values:
-# - center       = (-7.9, 8.5) | (7.9, -8.5) | (0, 0)
-# - inner_radius = 8           | 10          | 26
-# - outer_radius = 10          | 12          | 30
-
-ring_1.build_geometry(center=(-7.9,  8.5), inner_radius=8,  outer_radius=10, alpha=180, theta=45)
-ring_2.build_geometry(center=( 7.9, -8.5), inner_radius=10, outer_radius=12, alpha=180, theta=0)
-ring_3.build_geometry(center=( 0,    0),   inner_radius=26, outer_radius=30, alpha=90, theta=45)
-
-# 3.3. Build the meshes
-
-# Mesh multiplication factor, to globally
-# increase or decrease the number of elements.
-mesh_mult = 3
-
-ring_1.build_mesh(
-    nelem_radial=1*mesh_mult,
-    nelem_contour_coarse=4*mesh_mult,
-    nelem_contour_fine=12*mesh_mult
-)
-ring_2.build_mesh(
-    nelem_radial=1*mesh_mult,
-    nelem_contour_coarse=12*mesh_mult,
-    nelem_contour_fine=12*mesh_mult
-)
-ring_3.build_mesh(
-    nelem_radial=1*mesh_mult,
-    nelem_contour_coarse=10*mesh_mult,
-    nelem_contour_fine=12*mesh_mult
-)
-
-# 3.4. Build the constitutive materials
-#
-# INFO: reference paper values:
-# - constitutive_material = ElastHypoMaterial,
-# - mass_density          = 1e-7  | 1e-8 | 1e-6
-# - elastic_modulus       = 10E3  | 2250 | 288E3
-# - poisson_ratio         = 0.125 | 0.125| 0.125
-
-ring_1.build_elastic_material(
-    mass_density          = 1e-7,
-    elastic_modulus       = 10E3,
-    poisson_ratio         = 0.125
-)
-ring_2.build_elastic_material(
-    mass_density          = 1e-8,
-    elastic_modulus       = 2250,
-    poisson_ratio         = 0.125
-)
-ring_3.build_elastic_material(
-    mass_density          = 1e-6,
-    elastic_modulus       = 288E3,
-    poisson_ratio         = 0.125
-)
-
-# 3.5. Build the element types and fields
-
-ring_1.build_element(elem_type=Volume2DElement)
-ring_2.build_element(elem_type=Volume2DElement)
-ring_3.build_element(elem_type=Volume2DElement)
-
-# 3.6. Build the contact laws (and associated materials)
-#
-# INFO: reference paper value:
-# coef_frot = 0.3
-# ring_1.build_coulomb_contact(
-#     pen_normale   = 1E6,
-#     pen_tangent   = 1E6,
-#     prof_cont     = ring_1.thickness * prof_contact_fraction,
-#     coef_frot_dyn = 0.3,
-#     coef_frot_sta = 0.3
-# )
-
-# Fraction of the ring tickness that should be used for the contact depth
-prof_contact_fraction = 1/5
-
-# Minimal depth of contact that is defined
-# Useful to dynamically set the time integration step
-min_prof_cont = min(ring_1.thickness, ring_2.thickness, ring_3.thickness) * prof_contact_fraction
-
-ring_1.build_frictionless_contact(
-    pen_normale = 1E6,
-    prof_cont   = ring_1.thickness * prof_contact_fraction,
-)
-ring_2.build_frictionless_contact(
-    pen_normale = 1E6,
-    prof_cont   = ring_2.thickness * prof_contact_fraction,
-)
-ring_3.build_frictionless_contact(
-    pen_normale = 1E6,
-    prof_cont   = ring_3.thickness * prof_contact_fraction,
-)
+# 3. CREATE THE RINGS {{{1
+
+def create_rings(p):
+    """Create and build all the Ring objects, as specified by p['rings']."""
+    rings = []
+
+    mesh_mult = p['mesh_mult']
+    vol_int_meth = {'SRIPR': VES_CMVIM_SRIPR, 'STD': VES_CMVIM_STD}[p['volume_integration']]
+
+    for spec in p['rings']:
+        ring = Ring()
+
+        # 3.1. Build the geometry
+        ring.build_geometry(
+            center=spec['center'],
+            inner_radius=spec['inner_radius'],
+            outer_radius=spec['outer_radius'],
+            alpha=spec['alpha'],
+            theta=spec['theta'],
+        )
+
+        # 3.2. Build the mesh
+        ring.build_mesh(
+            nelem_radial=spec['nelem_radial']*mesh_mult,
+            nelem_contour_coarse=spec['nelem_contour_coarse']*mesh_mult,
+            nelem_contour_fine=spec['nelem_contour_fine']*mesh_mult
+        )
+
+        # 3.3. Build the constitutive material
+        if spec['material'] == 'elastic':
+            ring.build_elastic_material(
+                mass_density    = spec['mass_density'],
+                elastic_modulus = spec['elastic_modulus'],
+                poisson_ratio   = spec['poisson_ratio']
+            )
+        elif spec['material'] == 'plastic':
+            ring.build_perfectly_plastic_material(
+                mass_density    = spec['mass_density'],
+                elastic_modulus = spec['elastic_modulus'],
+                poisson_ratio   = spec['poisson_ratio'],
+                ih_sigel        = spec['ih_sigel']
+            )
+        else:
+            raise ValueError(f"Unknown material: {spec['material']}")
+
+        # 3.4. Build the element type and field
+        ring.build_element(elem_type=Volume2DElement, vol_int_meth=vol_int_meth)
+
+        # 3.5. Build the contact law (and associated material)
+        if p['contact_law'] == 'frictionless':
+            ring.build_frictionless_contact(
+                pen_normale = p['pen_normale'],
+                prof_cont   = ring.thickness * p['prof_contact_fraction'],
+            )
+        elif p['contact_law'] == 'coulomb':
+            ring.build_coulomb_contact(
+                pen_normale   = p['pen_normale'],
+                pen_tangent   = p['pen_tangent'],
+                prof_cont     = ring.thickness * p['prof_contact_fraction'],
+                coef_frot_dyn = p['coef_frot_dyn'],
+                coef_frot_sta = p['coef_frot_sta']
+            )
+        else:
+            raise ValueError(f"Unknown contact law: {p['contact_law']}")
+
+        rings.append(ring)
+
+    return rings
 
 # 4. CONTACT INTERACTIONS {{{1
 
-def build_outer_outer_contact(r1: Ring, r2: Ring):
-    contact_33 = DdContactInteraction(Ring.id_interaction)
-    contact_44 = DdContactInteraction(Ring.id_interaction+1)
-    contact_34 = DdContactInteraction(Ring.id_interaction+2)
-    contact_43 = DdContactInteraction(Ring.id_interaction+3)
-
-    contact_33.setTool(r1.curve[3])
-    contact_33.push(r2.curve[3])
-    contact_33.addProperty(r1.contact_elem)
-
-    contact_44.setTool(r1.curve[4])
-    contact_44.push(r2.curve[4])
-    contact_44.addProperty(r1.contact_elem)
-
-    contact_34.setTool(r1.curve[3])
-    contact_34.push(r2.curve[4])
-    contact_34.addProperty(r1.contact_elem)
-
-    contact_43.setTool(r1.curve[4])
-    contact_43.push(r2.curve[3])
-    contact_43.addProperty(r1.contact_elem)
-
-    domain.getInteractionSet().add(contact_33)
-    domain.getInteractionSet().add(contact_44)
-    domain.getInteractionSet().add(contact_34)
-    domain.getInteractionSet().add(contact_43)
+# INFO:
+# Each contact between two rings registers one DdContactInteraction per pair
+# of facing curves, that Metafor checks at every iteration. Before creating
+# them, the pairs of curves that cannot meet are pruned: the bounding box
+# of each curve is enlarged by the distance that its ring can travel until
+# the final time, plus the deformation that the ring can undergo, and two
+# curves can only meet if their enlarged boxes overlap.
+#
+# This bound must hold whatever happens during the impact, so it is loose:
+# at the reference impact speed, a ring can travel further than the size
+# of the reference scene, in which nothing is pruned. Pruning only pays
+# off for large scenes of small rings, e.g. about 6% of the pairs of a
+# 30-ring packed_scene(), and for short final times. The created and
+# pruned interactions of each contact kind are counted in the build
+# profile, see p['profile'].
+
+def motion_reach(p, rings):
+    """Distance that each ring can reach until the final time, by ring id.
+
+    No ring can get more kinetic energy than the initial kinetic energy
+    of the impactor rings, which bounds the speed of its center of gravity.
+    The free rings can further deform up to their outer radius, while the
+    clamped ring can deform up to its thickness.
+    """
+    mass = {
+        ring.id: spec['mass_density'] * math.pi * (ring.ro**2 - ring.ri**2)
+        for ring, spec in zip(rings, p['rings'])
+    }
+    impactor_mass = sum(mass[rings[i-1].id] for i in ring_numbers(p['impactor_ring']))
+    fixed = [rings[i-1] for i in ring_numbers(p['fixed_ring'])]
+    init_speed_magnitude = math.sqrt(p['init_speed'][0]**2 + p['init_speed'][1]**2)
+    duration = p['final_time'] - p['initial_time']
+
+    reach = {}
+    for ring in rings:
+        if ring in fixed:
+            reach[ring.id] = ring.thickness
+        else:
+            max_speed = init_speed_magnitude * math.sqrt(impactor_mass / mass[ring.id])
+            reach[ring.id] = max_speed * duration + ring.ro
+
+    return reach
+
+def can_meet(r1: Ring, c1, r2: Ring, c2, reach, prof_cont):
+    """Whether curve c1 of ring r1 and curve c2 of ring r2 can come into contact."""
+    margin = reach[r1.id] + reach[r2.id] + prof_cont
+    b1, b2 = r1.bbox[c1], r2.bbox[c2]
+    return (b1[0] - margin <= b2[2] and b2[0] - margin <= b1[2]
+            and b1[1] - margin <= b2[3] and b2[1] - margin <= b1[3])
+
+def build_contact_pairs(tool: Ring, target: Ring, curve_pairs, contact_elem,
+                        single_pass=False, reach=None, prof_cont=0.0):
+    """Create one DdContactInteraction per (tool curve, target curve) pair.
+
+    If reach is given, the pairs of curves that cannot meet are skipped.
+    Return the numbers of created and pruned interactions.
+    """
+    n_created, n_pruned = 0, 0
+    for c_tool, c_target in curve_pairs:
+        if reach is not None and not can_meet(tool, c_tool, target, c_target, reach, prof_cont):
+            n_pruned += 1
+            continue
+
+        contact = DdContactInteraction(Ring.id_interaction)
+        contact.setTool(tool.curve[c_tool])
+        contact.push(target.curve[c_target])
+        contact.addProperty(contact_elem)
+        if single_pass:
+            contact.setSinglePass()
+        domain.getInteractionSet().add(contact)
 
-    Ring.id_interaction += 4
+        Ring.id_interaction += 1
+        n_created += 1
 
-def build_outer_inner_contact(outer: Ring, inner: Ring):
-    contact_13 = DdContactInteraction(Ring.id_interaction)
-    contact_24 = DdContactInteraction(Ring.id_interaction+1)
-    contact_14 = DdContactInteraction(Ring.id_interaction+2)
-    contact_23 = DdContactInteraction(Ring.id_interaction+3)
+    return n_created, n_pruned
 
-    contact_13.setTool(outer.curve[1])
-    contact_13.push(inner.curve[3])
-    contact_13.addProperty(inner.contact_elem)
+@profiled
+def build_outer_outer_contact(r1: Ring, r2: Ring, single_pass=False, reach=None, prof_cont=0.0):
+    return build_contact_pairs(
+        r1, r2, [(3, 3), (4, 4), (3, 4), (4, 3)], r1.contact_elem,
+        single_pass, reach, prof_cont
+    )
 
-    contact_24.setTool(outer.curve[2])
-    contact_24.push(inner.curve[4])
-    contact_24.addProperty(inner.contact_elem)
+@profiled
+def build_outer_inner_contact(outer: Ring, inner: Ring, single_pass=False, reach=None, prof_cont=0.0):
+    return build_contact_pairs(
+        outer, inner, [(1, 3), (2, 4), (1, 4), (2, 3)], inner.contact_elem,
+        single_pass, reach, prof_cont
+    )
 
-    contact_14.setTool(outer.curve[1])
-    contact_14.push(inner.curve[4])
-    contact_14.addProperty(inner.contact_elem)
+def create_contacts(p, rings):
+    """Create the contacts between rings, and the self contacts.
 
-    contact_23.setTool(outer.curve[2])
-    contact_23.push(inner.curve[3])
-    contact_23.addProperty(inner.contact_elem)
+    Return the numbers of created and pruned interactions between rings.
+    """
+    build_contact = {
+        'outer_inner': build_outer_inner_contact,
+        'outer_outer': build_outer_outer_contact,
+    }
 
-    domain.getInteractionSet().add(contact_13)
-    domain.getInteractionSet().add(contact_24)
-    domain.getInteractionSet().add(contact_14)
-    domain.getInteractionSet().add(contact_23)
+    reach = motion_reach(p, rings) if p['prune_contacts'] else None
+    max_prof_cont = max(ring.thickness for ring in rings) * p['prof_contact_fraction']
 
-    Ring.id_interaction += 4
+    n_created, n_pruned = 0, 0
+    for kind, i, j in p['contacts']:
+        created, pruned = build_contact[kind](
+            rings[i-1], rings[j-1], p['single_pass'], reach, max_prof_cont
+        )
+        n_created += created
+        n_pruned += pruned
+        profile_count(build_contact[kind].__qualname__, 'pruned_interactions', pruned)
 
-build_outer_inner_contact(ring_3, ring_1)
-build_outer_inner_contact(ring_3, ring_2)
-build_outer_outer_contact(ring_1, ring_2)
+    for ring in rings:
+        ring.build_self_contact()
 
-ring_1.build_self_contact()
-ring_2.build_self_contact()
-ring_3.build_self_contact()
+    return n_created, n_pruned
 
 # 5. BOUNDARY CONDITIONS AND INITIAL CONDITIONS {{{1
 
-# Dirichlet condition on outer side of ring 3
-domain.getLoadingSet().define(ring_3.curve[3], Field1D(TX, RE), 0.0)
-domain.getLoadingSet().define(ring_3.curve[3], Field1D(TY, RE), 0.0)
-domain.getLoadingSet().define(ring_3.curve[4], Field1D(TX, RE), 0.0)
-domain.getLoadingSet().define(ring_3.curve[4], Field1D(TY, RE), 0.0)
-
 def set_initial_speed(ring: Ring, v0_x, v0_y):
     initial_conditions.define(ring.side[1], Field1D(TX, GV), v0_x)
     initial_conditions.define(ring.side[1], Field1D(TY, GV), v0_y)
     initial_conditions.define(ring.side[2], Field1D(TX, GV), v0_x)
     initial_conditions.define(ring.side[2], Field1D(TY, GV), v0_y)
 
-# Give initial speed to the inner ring 1
-# INFO: reference paper values: (30mm/ms, -30mm/ms)
-init_speed = (30E3, -30E3)
-init_speed_magnitude = math.sqrt(init_speed[0]**2 + init_speed[1]**2)
-set_initial_speed(ring_1, *init_speed)
-
-# 6. TIME INTEGRATION {{{1
-
-ti = AlphaGeneralizedTimeIntegration(metafor)
-metafor.setTimeIntegration(ti)
-
-# Initial time
-initial_time = 0.0
-
-# Initial time step.
-# Should be small enough so that the nodes of ring_1 do not jump over
-# the contact detection area of ring_2 between two time step.
-time_step = min_prof_cont / init_speed_magnitude
-tsm.setInitialTime(initial_time, time_step)
-
-# Intermediate and/or final time.
-# final_time = 2E-4  # for small tests
-# final_time = 3E-3  # after bounce
-final_time = 8E-4  # Start to rebounce
+def apply_conditions(p, rings):
+    """Clamp the fixed rings, and give their initial speed to the impactor rings."""
+    # Dirichlet condition on outer side of the fixed rings
+    for i in ring_numbers(p['fixed_ring']):
+        fixed_ring = rings[i-1]
+        domain.getLoadingSet().define(fixed_ring.curve[3], Field1D(TX, RE), 0.0)
+        domain.getLoadingSet().define(fixed_ring.curve[3], Field1D(TY, RE), 0.0)
+        domain.getLoadingSet().define(fixed_ring.curve[4], Field1D(TX, RE), 0.0)
+        domain.getLoadingSet().define(fixed_ring.curve[4], Field1D(TY, RE), 0.0)
 
-# Maximimum time step allowed.
-# As for the initial time step, the maximum time step
-# is chosen low enough to make sure that the ring nodes
-# will never jump over the contact detection area.
-max_time_step = min_prof_cont / init_speed_magnitude
+    # Give initial speed to the impactor rings
+    for i in ring_numbers(p['impactor_ring']):
+        set_initial_speed(rings[i-1], *p['init_speed'])
 
-# Number of intemediate simulation state to save.
-# Those are saved in compressed bfac.gz files.
-n_intermediate = 199
-
-# Here, next specified time is just the final time
-tsm.setNextTime(final_time, n_intermediate, max_time_step)
+# 6. TIME INTEGRATION {{{1
 
-# Set the residual tolerance
-res_tol = 1E-4  # default is 1E-4 (chap. 11)
-mim.setResidualTolerance(res_tol)
+def set_time_integration(p, rings):
+    """Set the time integration scheme, the time steps and the tolerances."""
+    ti = AlphaGeneralizedTimeIntegration(metafor)
+    metafor.setTimeIntegration(ti)
+
+    # Minimal depth of contact that is defined
+    # Useful to dynamically set the time integration step
+    min_prof_cont = min(ring.thickness for ring in rings) * p['prof_contact_fraction']
+    init_speed_magnitude = math.sqrt(p['init_speed'][0]**2 + p['init_speed'][1]**2)
+
+    # Initial time step.
+    # Should be small enough so that the nodes of ring_1 do not jump over
+    # the contact detection area of ring_2 between two time step.
+    time_step = p['time_step']
+    if time_step is None:
+        time_step = min_prof_cont / init_speed_magnitude
+    tsm.setInitialTime(p['initial_time'], time_step)
+
+    # Maximimum time step allowed.
+    # As for the initial time step, the maximum time step
+    # is chosen low enough to make sure that the ring nodes
+    # will never jump over the contact detection area.
+    max_time_step = p['max_time_step']
+    if max_time_step is None:
+        max_time_step = min_prof_cont / init_speed_magnitude
+
+    # Here, next specified time is just the final time.
+    # The intermediate simulation states are saved in compressed bfac.gz files.
+    #
+    # With a time-step schedule, the run is rather split in successive phases,
+    # each with its own maximum time step. Beyond the schedule, the maximum
+    # time step above is used.
+    #
+    # With an archiving schedule, the run is also split where the interval
+    # between two archived states changes. Beyond the schedule, and without
+    # schedule, the n_intermediate states are equally spaced.
+    duration = p['final_time'] - p['initial_time']
+    step_phases = list(p['time_schedule'] or []) + [(p['final_time'], max_time_step)]
+    frame_phases = list(p['archive_schedule'] or []) + [(p['final_time'], duration / p['n_intermediate'])]
+
+    def phase_value(phases, time):
+        return next(value for end_time, value in phases if end_time >= time)
+
+    breaks = sorted({
+        end_time for end_time, _ in step_phases + frame_phases
+        if p['initial_time'] < end_time <= p['final_time']
+    })
+
+    previous_time = p['initial_time']
+    for end_time in breaks:
+        phase_step = phase_value(step_phases, end_time)
+        n_phase = max(1, round((end_time-previous_time) / phase_value(frame_phases, end_time)))
+        tsm.setNextTime(end_time, n_phase, phase_step)
+        previous_time = end_time
+
+    # Set the residual tolerance
+    mim.setResidualTolerance(p['res_tol'])
 
 # 7. ARCHIVING {{{1
 
@@ -527,55 +894,132 @@ mim.setResidualTolerance(res_tol)
 # throught the fac_values_manager than to save every time step
 # through the values_manager.
 
-# Keep track of the number of values managers
-# and fac values managers that are instantiated
-id_fac = 1
-
-# Time sample of the simulation recordings
-fac_values_manager.add(id_fac, MiscValueExtractor(metafor, EXT_T), 'tSample')
-id_fac += 1
-
-# Dict gathering the nodal fields to archive
-# over the entire problem geometry.
-dbnodal_fields = {
-    "AB_TX":  Field1D(TX, AB),
-    "AB_TY":  Field1D(TY, AB),
-    "RE_TX":  Field1D(TX, RE),
-    "RE_TY":  Field1D(TY, RE),
-    "GV_TX":  Field1D(TX,GV),
-    "GV_TY":  Field1D(TY,GV),
-    "GF1_TX": Field1D(TX,GF1),
-    "GF1_TY": Field1D(TY,GF1),
-    "GF2_TX": Field1D(TX,GF2),
-    "GF2_TY": Field1D(TY,GF2),
+# Ring layout of the problem, written in the workspace directory
+LAYOUT_FILE = 'layout.json'
+
+# Nodal fields archived by each profile, in both directions TX and TY:
+#   kinematics -> Positions, displacements and velocities
+#   energy     -> Displacements, velocities, external and internal forces
+#   contact    -> Positions, displacements and external (contact) forces
+#   full       -> All of them, as required by the Matlab post-processing
+ARCHIVE_PROFILES = {
+    'kinematics': ('AB', 'RE', 'GV'),
+    'energy':     ('RE', 'GV', 'GF1', 'GF2'),
+    'contact':    ('AB', 'RE', 'GF1'),
+    'full':       ('AB', 'RE', 'GV', 'GF1', 'GF2'),
 }
 
-# Save the desired nodal fields for the whole geometry
-for id_field, field in dbnodal_fields.items():
-    for id_ring, ring in enumerate([ring_1, ring_2, ring_3]):
-        for id_curve, curve in enumerate(ring.curve[1:]):
-            extractor = DbNodalValueExtractor(curve, field, sOp=SortByKsi0(curve), maxV=-1)
-            id_extractor = f'{id_field}_curve{id_curve+1}_ring{id_ring+1}'
-            fac_values_manager.add(id_fac, extractor, id_extractor)
-            id_fac += 1
+@profiled
+def set_archiving(p, rings):
+    """Save the desired quantities in .ascii files."""
+    # Keep track of the number of values managers
+    # and fac values managers that are instantiated
+    id_fac = 1
+
+    # Time sample of the simulation recordings
+    fac_values_manager.add(id_fac, MiscValueExtractor(metafor, EXT_T), 'tSample')
+    id_fac += 1
+
+    # Dict gathering the nodal fields to archive
+    # over the entire problem geometry.
+    dbnodal_fields = {
+        "AB_TX":  Field1D(TX, AB),
+        "AB_TY":  Field1D(TY, AB),
+        "RE_TX":  Field1D(TX, RE),
+        "RE_TY":  Field1D(TY, RE),
+        "GV_TX":  Field1D(TX,GV),
+        "GV_TY":  Field1D(TY,GV),
+        "GF1_TX": Field1D(TX,GF1),
+        "GF1_TY": Field1D(TY,GF1),
+        "GF2_TX": Field1D(TX,GF2),
+        "GF2_TY": Field1D(TY,GF2),
+    }
+
+    # Only keep the fields of the archiving profile
+    profile = p['archive_profile']
+    kept = ARCHIVE_PROFILES[profile] if isinstance(profile, str) else tuple(profile)
+    dbnodal_fields = {
+        id_field: field for id_field, field in dbnodal_fields.items()
+        if id_field.rsplit('_', 1)[0] in kept
+    }
+
+    # Save the desired nodal fields for the whole geometry
+    for id_field, field in dbnodal_fields.items():
+        for id_ring, ring in enumerate(rings):
+            for id_curve, curve in enumerate(ring.curve[1:]):
+                extractor = DbNodalValueExtractor(curve, field, sOp=SortByKsi0(curve), maxV=-1)
+                id_extractor = f'{id_field}_curve{id_curve+1}_ring{id_ring+1}'
+                fac_values_manager.add(id_fac, extractor, id_extractor)
+                id_fac += 1
+    profile_count('set_archiving', 'extractors', id_fac - 1)
+
+    # Save the ring layout next to the archived values, so that the
+    # post-processing knows the rings and curves that were archived.
+    layout = {
+        'n_ring': len(rings),
+        'n_curve': len(rings[0].curve) - 1,
+        'fields': list(dbnodal_fields),
+        'rings': p['rings'],
+        'contacts': p['contacts'],
+        'fixed_ring': ring_numbers(p['fixed_ring']),
+        'impactor_ring': ring_numbers(p['impactor_ring']),
+        'init_speed': p['init_speed'],
+        'mesh_mult': p['mesh_mult'],
+    }
+    with open(LAYOUT_FILE, 'w') as file:
+        json.dump(layout, file, indent=4)
 
 # DEBUG OPTIONS {{{1
 
-# Set and toggle here what has to be debugged.
-debug = {
-    'geometry': False,
-    'mesh': False,
-}
+def show_debug(p):
+    """Show what has to be debugged, as toggled in p['debug']."""
+    if p['debug']['geometry']:
+        win = VizWin()
+        win.add(pointset)
+        win.add(curveset)
+        win.open()
+        input()
+    if p['debug']['mesh']:
+        win = VizWin()
+        win.add(geometry.getMesh().getPointSet())
+        win.add(geometry.getMesh().getCurveSet())
+        win.open()
+        input()
+
+# 8. BUILD THE METAFOR OBJECT {{{1
+
+# Parameters of the last built Metafor object
+_built_params = None
+
+def getMetafor(p={}):
+    """Build the whole problem, from the parameters overriding params()."""
+    global _built_params, _profile
+
+    p = params(p)
+
+    # Metafor may ask several times for the same problem
+    if metafor is not None and p == _built_params:
+        return metafor
 
-if debug['geometry']:
-    win = VizWin()
-    win.add(pointset)
-    win.add(curveset)
-    win.open()
-    input()
-if debug['mesh']:
-    win = VizWin()
-    win.add(geometry.getMesh().getPointSet())
-    win.add(geometry.getMesh().getCurveSet())
-    win.open()
-    input()
+    _profile = {} if p['profile'] else None
+    tic = time.perf_counter()
+
+    import_wrap()
+    instantiate_metafor(p)
+    Ring.reset_ids()
+
+    rings = create_rings(p)
+    create_contacts(p, rings)
+    apply_conditions(p, rings)
+    set_time_integration(p, rings)
+    set_archiving(p, rings)
+
+    if _profile is not None:
+        write_profile(p, time.perf_counter() - tic)
+        _profile = None
+
+    show_debug(p)
+
+    _built_params = p
+
+    return metafor